@@ -1,11 +1,55 @@
 import argparse
 import json
-import multiprocessing
 import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from loguru import logger
 
-from modules.versions.versions import create_version_archive
+from modules import site_config
+
+# Work directory of each version inside of the archive directory, the archive is only moved out of it once complete
+partial_directory_name = ".partial"
+
+# gzip compression level of the archives, from 1 (fastest) to 9 (smallest)
+default_compression_level = 6
+
+
+def get_archive_filename(version_data):
+    """Return the filename of the archive of a version."""
+    return f"website-{version_data['name']}.tar.gz"
+
+
+def get_partial_directory(archive_dir, version_data):
+    """Return the directory the archive of a version is created in until it is complete."""
+    return os.path.join(archive_dir, partial_directory_name, version_data["name"])
+
+
+def archive_version(version_data, archive_dir, compression_level):
+    """Create the archive of a version in its work directory and move it to the archive directory when complete.
+
+    The move is atomic, so an interrupted run never leaves an incomplete archive that the next run would take
+    for a complete one. What an interrupted run left in the work directory is discarded, the version is
+    archived again from the start: resuming inside of a version and sharing unchanged files between versions
+    would need checkpoints in create_version_archive, which are not implemented.
+    """
+    # The versions module is optional, it isn't needed to run the archive of versions that are complete
+    from modules.versions.versions import create_version_archive
+
+    start_time = time.time()
+    partial_dir = get_partial_directory(archive_dir, version_data)
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    os.makedirs(partial_dir)
+
+    create_version_archive(version_data, partial_dir, compression_level=compression_level)
+
+    archive_filename = get_archive_filename(version_data)
+    os.replace(os.path.join(partial_dir, archive_filename), os.path.join(archive_dir, archive_filename))
+    shutil.rmtree(partial_dir, ignore_errors=True)
+
+    return time.time() - start_time
 
 
 def main():
@@ -16,8 +60,23 @@ def main():
     parser.add_argument(
         "--archive-dir",
         "-a",
-        default="attack-version-archives",
-        help="Directory where version archives will be created (default: attack-version-archives)",
+        default=site_config.default_archive_dir,
+        help=f"Directory where version archives will be created (default: {site_config.default_archive_dir})",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of versions archived at the same time. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        choices=range(1, 10),
+        metavar="{1-9}",
+        default=default_compression_level,
+        help=f"gzip compression level of the archives (default: {default_compression_level})",
     )
 
     args = parser.parse_args()
@@ -31,25 +90,41 @@ def main():
 
     logger.info(f"Processing previous versions of ATT&CK website to {archive_dir}")
 
-    processes = []
+    pending_versions = []
     for version_data in version_json["previous"]:
-        archive_path = os.path.join(archive_dir, f"website-{version_data['name']}.tar.gz")
+        archive_path = os.path.join(archive_dir, get_archive_filename(version_data))
         if os.path.exists(archive_path):
             logger.info(f"Archive already exists for {version_data['name']}: {archive_path} -- skipping.")
             continue
 
-        p = multiprocessing.Process(
-            target=create_version_archive,
-            args=(version_data, archive_dir),
-            name=f"Process-{version_data['name']}",
-        )
-        processes.append(p)
-        p.start()
-        logger.info(f"Started process for {version_data['name']} (PID: {p.pid})")
-
-    for p in processes:
-        p.join()
-        logger.info(f"Process {p.name} for version finished (PID: {p.pid})")
+        if os.path.isdir(get_partial_directory(archive_dir, version_data)):
+            logger.info(f"Discarding the incomplete archive of {version_data['name']} left by an interrupted run")
+
+        pending_versions.append(version_data)
+
+    if not pending_versions:
+        logger.info("All versions processed")
+        return
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(pending_versions)))) as executor:
+        futures = {
+            executor.submit(archive_version, version_data, archive_dir, args.compression_level): version_data["name"]
+            for version_data in pending_versions
+        }
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                duration = future.result()
+                logger.info(f"[{done}/{len(futures)}] Archived {name} in {duration:.2f} seconds")
+            except Exception as ex:
+                failed.append(name)
+                logger.error(f"[{done}/{len(futures)}] Failed to archive {name}: {type(ex).__name__}: {ex}")
+
+    if failed:
+        logger.error(f"Versions that were not archived, run again to archive them: {', '.join(failed)}")
+        sys.exit(1)
 
     logger.info("All versions processed")
 
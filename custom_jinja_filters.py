@@ -2,8 +2,10 @@
 import json
 import os
 import re
+from functools import lru_cache
 
 import markdown
+from loguru import logger
 
 from modules import site_config
 
@@ -26,12 +28,23 @@ reference_marker_template_no_url = (
     "<sup>[{}]</sup></span>"
 )
 
-# Pelican settings global variable
+# Citation markers inside of STIX descriptions, e.g. "(Citation: Name)"
+citation_regex = re.compile(r"\(Citation: (.*?)\)")
+
+# Markdown converter shared by every stixToHTML call, reset before each conversion
+markdown_converter = markdown.Markdown(extensions=["nl2br"])
+
+# Maximum number of converted descriptions kept in memory
+markdown_cache_size = 8192
+
+# Pelican settings global variable, replaced with the staged settings when the website_build module runs Pelican
 pelican_settings = {}
 
+# Settings stored by the last build, used when running pelican manually
 pelican_settings_f = os.path.join(site_config.data_directory, "pelican_settings.json")
-with open(pelican_settings_f, "r", encoding="utf8") as json_f:
-    pelican_settings = json.load(json_f)
+if os.path.isfile(pelican_settings_f):
+    with open(pelican_settings_f, "r", encoding="utf8") as json_f:
+        pelican_settings = json.load(json_f)
 
 # Custom Jinja Filters
 
@@ -64,6 +77,18 @@ def flatten_tree(root):
     return ret
 
 
+# Side navigation trees by key, each tree is read once per build
+side_nav_trees = {}
+
+
+def side_nav(key):
+    """Return the side navigation tree that the build wrote for the given key, e.g. "techniques"."""
+    if key not in side_nav_trees:
+        with open(os.path.join(site_config.side_nav_dir, f"{key}.json"), "r", encoding="utf8") as json_f:
+            side_nav_trees[key] = json.load(json_f)
+    return side_nav_trees[key]
+
+
 def clean_stix_data(data):
     """Clean stix data from unwanted characters."""
     return data.replace("\n", "").replace("”", '"').replace("“", '"')
@@ -71,8 +96,21 @@ def clean_stix_data(data):
 
 def get_citations(data):
     """Given a description, find all of the citations."""
-    p = re.compile(r"\(Citation: (.*?)\)")
-    return p.findall(data)
+    return citation_regex.findall(data)
+
+
+@lru_cache(maxsize=markdown_cache_size)
+def markdown_to_html(data):
+    """Convert a markdown string to HTML, each unique string is only converted once."""
+    return markdown_converter.reset().convert(data)
+
+
+def log_markdown_cache_info():
+    """Log how often markdown_to_html was served from its cache."""
+    cache_info = markdown_to_html.cache_info()
+    logger.info(
+        f"stixToHTML markdown cache: {cache_info.hits} hits, {cache_info.misses} misses, {cache_info.currsize} entries"
+    )
 
 
 def get_html_citation(citations, citation_name):
@@ -121,28 +159,23 @@ def get_html_citation(citations, citation_name):
 
 def update_citations(data, citations):
     """Given a data string and the citation list, update citations with the citation names that are held in string."""
-    citation_template = "(Citation: {})"
 
-    citation_names = get_citations(data)
+    def replace_citation(match):
+        # Citations that are not in the list are left as they are
+        return get_html_citation(citations, match.group(1)) or match.group(0)
 
-    for citation_name in citation_names:
-        replace_string = get_html_citation(citations, citation_name)
+    if "(Citation: " not in data:
+        return data
 
-        if replace_string:
-            data = data.replace(citation_template.format(citation_name), replace_string)
-
-    return data
+    return citation_regex.sub(replace_citation, data)
 
 
 def remove_citations(data):
     """Remove citations from strings."""
-    # Get citations names to remove from string
-    citation_names = get_citations(data)
-
-    for citation_name in citation_names:
-        data = data.replace("(Citation: " + citation_name + ")", "")
+    if "(Citation: " not in data:
+        return data
 
-    return data
+    return citation_regex.sub("", data)
 
 
 def filter_urls(data):
@@ -169,7 +202,7 @@ def stixToHTML(data, citations, firstParagraphOnly, convert):
     """
     if convert:
         # Replace data from markdown format
-        data = markdown.markdown(data, extensions=["nl2br"])
+        data = markdown_to_html(data)
 
     # Replace url links
     data = filter_urls(data)
@@ -2,8 +2,12 @@ import os
 
 menu_ptr = []
 run_ptr = []
+# Steps that run after every module, e.g. on the final output
+post_build_ptr = []
 pelican_settings = []
 master_redirections_dict = {}
+# Titles of the redirect pages of master_redirections_dict, by from path
+master_redirection_titles = {}
 
 
 def sort_menu_by_priority():
@@ -31,6 +35,8 @@ def check_redirections(redirections_list):
                 exit()
         else:
             master_redirections_dict[redirection["from"]] = redirection["to"]
+            if redirection.get("title"):
+                master_redirection_titles[redirection["from"]] = redirection["title"]
 
 
 for module in os.listdir("modules"):
@@ -46,6 +52,8 @@ for module in os.listdir("modules"):
                     "priority": imported_module.get_priority(),
                 }
             )
+        if hasattr(imported_module, "run_post_build"):
+            post_build_ptr.append({"run_post_build": imported_module.run_post_build, "module_name": module})
         if hasattr(imported_module, "send_to_pelican"):
             pelican_settings.append({"module_name": imported_module.send_to_pelican()})
         if hasattr(imported_module, "get_redirections"):
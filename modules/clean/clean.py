@@ -3,15 +3,21 @@ import shutil
 
 from loguru import logger
 
-from modules import site_config
+from modules import site_config, util
 
 
 def clean_website_build():
     """Clean content directory and remove output directory."""
+    # Incremental builds reuse the content and output of the previous build
+    incremental = util.buildmanifest.is_incremental()
+
     # Clean content directory
-    logger.info(f"Deleting content directory: {site_config.content_dir}")
-    if os.path.isdir(site_config.content_dir):
-        shutil.rmtree(site_config.content_dir)
+    if incremental:
+        logger.info(f"Keeping content directory for incremental build: {site_config.content_dir}")
+    else:
+        logger.info(f"Deleting content directory: {site_config.content_dir}")
+        if os.path.isdir(site_config.content_dir):
+            shutil.rmtree(site_config.content_dir)
 
     # Delete module templates from template directory
     for filename in os.listdir(site_config.templates_directory):
@@ -25,9 +31,12 @@ def clean_website_build():
                 os.remove(full_file_path)
 
     # Remove output directory
-    logger.info(f"Deleting output directory: {site_config.web_directory}")
-    if os.path.isdir(site_config.web_directory):
-        shutil.rmtree(site_config.web_directory)
+    if incremental:
+        logger.info(f"Keeping output directory for incremental build: {site_config.web_directory}")
+    else:
+        logger.info(f"Deleting output directory: {site_config.web_directory}")
+        if os.path.isdir(site_config.web_directory):
+            shutil.rmtree(site_config.web_directory)
 
     # Remove reports directory
     logger.info(f"Deleting reports directory: {site_config.test_report_directory}")
@@ -1,5 +1,6 @@
 import json
 import os
+from collections import defaultdict
 
 from loguru import logger
 
@@ -7,6 +8,11 @@ from modules import site_config, util
 
 from . import matrices_config
 
+# Tactic x technique incidence of each domain, built on first use: domain => {"techniques", "technique_masks", ...}
+matrix_incidence = {}
+# Matrices of a domain on a set of platforms: (domain, platforms) => (matrices, has_subtechniques, tour_technique)
+sub_matrices_cache = {}
+
 
 def generate_matrices():
     """Responsible for verifying matrix directory and generating index matrix markdown."""
@@ -26,28 +32,31 @@ def generate_matrices():
 
     notes = util.relationshipgetters.get_objects_using_notes()
 
+    # The side navigation is written once, the pages reference it by key
     side_menu_data = util.buildhelpers.get_side_menu_matrices(matrices_config.matrices)
-    generate_sidebar_matrices(side_menu_data)
+    util.buildhelpers.write_side_nav_data(matrices_config.side_nav_key, side_menu_data)
+    generate_sidebar_matrices()
     matrix_generated = False
 
-    for matrix in matrices_config.matrices:
-        if matrix["type"] == "external":
-            # link to externally hosted matrix, don't create a page for it
-            continue
-        matrix_generated = generate_platform_matrices(matrix, notes, side_menu_data)
+    with util.profiler.stage("Matrix markdown"):
+        for matrix in matrices_config.matrices:
+            if matrix["type"] == "external":
+                # link to externally hosted matrix, don't create a page for it
+                continue
+            matrix_generated = generate_platform_matrices(matrix, notes)
 
     for deprecated_matrix in matrices_config.deprecated_matrices:
-        generate_deprecated_matrix(deprecated_matrix, side_menu_data)
+        generate_deprecated_matrix(deprecated_matrix)
 
     if not matrix_generated:
         util.buildhelpers.remove_module_from_menu(matrices_config.module_name)
 
 
-def generate_platform_matrices(matrix, notes, side_menu_data=None):
+def generate_platform_matrices(matrix, notes):
     """Given a matrix, generates the matrix markdown"""
     has_data = False
     data = {}
-    data["menu"] = side_menu_data
+    data["side_nav"] = matrices_config.side_nav_key
     data["domain"] = matrix["matrix"].split("-")[0]
     data["name"] = matrix["name"]
 
@@ -81,16 +90,16 @@ def generate_platform_matrices(matrix, notes, side_menu_data=None):
         md_file.write(subs)
 
     for subtype in matrix["subtypes"]:
-        generate_platform_matrices(subtype, notes, side_menu_data)
+        generate_platform_matrices(subtype, notes)
 
     return has_data
 
 
-def generate_deprecated_matrix(matrix, side_menu_data=None):
+def generate_deprecated_matrix(matrix):
     """Generate deprecated matrix md file"""
 
     data = {}
-    data["menu"] = side_menu_data
+    data["side_nav"] = matrices_config.side_nav_key
     data["name"] = matrix["name"]
     data["domain"] = matrix["matrix"].split("-")[0]
     data["path"] = matrix["path"]
@@ -129,16 +138,23 @@ def get_matrix_ids(matrices):
     return matrix_ids
 
 
-def get_sub_matrices(matrix):
+def get_matrix_incidence(domain):
+    """Return the tactic x technique incidence of a domain, built once per domain.
+
+    Techniques are indexed in matrix order, each with a bitmask of its platforms, so the techniques of a
+    tactic on a set of platforms are found without filtering the technique list again.
+    """
+    if domain in matrix_incidence:
+        return matrix_incidence[domain]
+
     ms = util.relationshipgetters.get_ms()
 
     # memorystore for the current domain
-    domain_ms = ms[matrix["matrix"]]
+    domain_ms = ms[domain]
     # get relevant techniques
-    techniques = util.stixhelpers.get_techniques(domain_ms, matrix["matrix"])
-    platform_techniques = util.buildhelpers.filter_techniques_by_platform(techniques, matrix["platforms"])
-    platform_techniques = util.buildhelpers.filter_out_subtechniques(platform_techniques)
-    platform_techniques = util.buildhelpers.filter_deprecated_revoked(platform_techniques)
+    techniques = util.stixhelpers.get_techniques(domain_ms, domain)
+    techniques = util.buildhelpers.filter_out_subtechniques(techniques)
+    techniques = util.buildhelpers.filter_deprecated_revoked(techniques)
     # get relevant tactics
     all_tactics = util.stixhelpers.get_all_of_type(domain_ms, ["x-mitre-tactic"])
     tactic_id_to_shortname = {}
@@ -148,6 +164,87 @@ def get_sub_matrices(matrix):
         else:
             logger.error(f"[{tactic['id']}] Tactic does not have 'x_mitre_shortname' set, ignoring: {tactic['name']}")
 
+    # Platform name => bit of the platform in the technique masks
+    platform_bits = {}
+
+    def platform_mask(technique):
+        """Return the bitmask of the platforms of a technique, adding new platforms to platform_bits."""
+        mask = 0
+        for platform in technique.get("x_mitre_platforms") or []:
+            if platform not in platform_bits:
+                platform_bits[platform] = 1 << len(platform_bits)
+            mask |= platform_bits[platform]
+        return mask
+
+    # Tactic shortname => indexes of the techniques in the tactic, in technique order
+    tactic_techniques = defaultdict(list)
+    for index, technique in enumerate(techniques):
+        if "kill_chain_phases" not in technique:
+            logger.warning(f"Technique not assigned to any Tactics: {technique['id']} - {technique['name']}")
+            continue
+        for phase_name in dict.fromkeys(phase["phase_name"] for phase in technique["kill_chain_phases"]):
+            tactic_techniques[phase_name].append(index)
+
+    subtechniques_of = util.relationshipgetters.get_subtechniques_of()
+
+    matrix_incidence[domain] = {
+        "techniques": techniques,
+        "technique_masks": [platform_mask(technique) for technique in techniques],
+        "tactics": {tactic["id"]: tactic for tactic in all_tactics},
+        "tactic_id_to_shortname": tactic_id_to_shortname,
+        "tactic_techniques": tactic_techniques,
+        # Technique id => [(sub-technique, platform mask)]
+        "subtechniques": {
+            technique["id"]: [
+                (subtechnique["object"], platform_mask(subtechnique["object"]))
+                for subtechnique in subtechniques_of[technique["id"]]
+            ]
+            for technique in techniques
+            if technique["id"] in subtechniques_of
+        },
+        "platform_bits": platform_bits,
+        "sub_matrices": util.stixhelpers.get_matrices(domain_ms, domain),
+    }
+
+    return matrix_incidence[domain]
+
+
+def get_sub_matrices(matrix):
+    """Return (matrices, has_subtechniques, tour_technique) of a matrix, computed once per domain and platforms."""
+    key = (matrix["matrix"], tuple(matrix["platforms"]))
+
+    if key not in sub_matrices_cache:
+        sub_matrices_cache[key] = build_sub_matrices(matrix["matrix"], matrix["platforms"])
+
+    return sub_matrices_cache[key]
+
+
+def build_sub_matrices(domain, platforms):
+    """Build the matrices of a domain, with the techniques of the given platforms (all if empty)."""
+    incidence = get_matrix_incidence(domain)
+
+    query_mask = 0
+    for platform in platforms:
+        query_mask |= incidence["platform_bits"].get(platform, 0)
+
+    def on_platforms(objs_and_masks):
+        """Return the objects that are on one of the platforms, without duplicate ids."""
+        if not platforms:
+            return [obj for obj, _ in objs_and_masks]
+
+        filtered = []
+        ids_for_duplicates = set()
+        for obj, mask in objs_and_masks:
+            if mask & query_mask and obj["id"] not in ids_for_duplicates:
+                ids_for_duplicates.add(obj["id"])
+                filtered.append(obj)
+        return filtered
+
+    # Techniques shown on the platforms, by object identity
+    platform_techniques = {
+        id(technique) for technique in on_platforms(zip(incidence["techniques"], incidence["technique_masks"]))
+    }
+
     has_subtechniques = False  # track whether the current matrix has subtechniques
     tour_technique = {  # technique used as an example in the sub-technique tour / usage explainer
         "technique": None,
@@ -155,17 +252,8 @@ def get_sub_matrices(matrix):
         "subtechnique_count": 0,
     }
 
-    # helper functions
-    def phase_names(technique):
-        """get kill chain phase names from the given technique"""
-        if "kill_chain_phases" not in technique:
-            logger.warning(f"Technique not assigned to any Tactics: {technique['id']} - {technique['name']}")
-            return []
-        phases = technique["kill_chain_phases"]
-        return [phase["phase_name"] for phase in phases]
-
-    def transform_technique(technique, tactic_id):
-        """transform a technique object into the format required by the matrix macro"""
+    def transform_technique(technique):
+        """Transform a technique object into the format required by the matrix macro."""
         attack_id = util.buildhelpers.get_attack_id(technique)
 
         obj = {}
@@ -180,25 +268,39 @@ def get_sub_matrices(matrix):
             obj["x_mitre_deprecated"] = technique.get("x_mitre_deprecated")
             obj["revoked"] = technique.get("revoked")
 
-            subtechniques_of = util.relationshipgetters.get_subtechniques_of()
-
-            if technique["id"] in subtechniques_of:
-                subtechniques = subtechniques_of[technique["id"]]
-                obj["subtechniques"] = list(map(lambda st: transform_technique(st["object"], tactic_id), subtechniques))
-                # Filter out empty subtechniques
-                obj["subtechniques"] = list(filter(lambda st: len(st) > 0, obj["subtechniques"]))
-                # Filter subtechniques by platform
-                obj["subtechniques"] = util.buildhelpers.filter_techniques_by_platform(
-                    obj["subtechniques"], matrix["platforms"]
-                )
+            if technique["id"] in incidence["subtechniques"]:
+                subtechniques = [
+                    (transform_technique(subtechnique), mask)
+                    for subtechnique, mask in incidence["subtechniques"][technique["id"]]
+                ]
+                # Filter out empty subtechniques, then by platform
+                subtechniques = on_platforms([(st, mask) for st, mask in subtechniques if len(st) > 0])
                 # remove deprecated and revoked
-                obj["subtechniques"] = util.buildhelpers.filter_deprecated_revoked(obj["subtechniques"])
+                subtechniques = util.buildhelpers.filter_deprecated_revoked(subtechniques)
                 # sort subtechniques by ATT&CK ID
-                obj["subtechniques"] = sorted(obj["subtechniques"], key=lambda x: x["external_id"])
+                obj["subtechniques"] = sorted(subtechniques, key=lambda x: x["external_id"])
+
+        return obj
 
-                nonlocal has_subtechniques
+    # A technique is transformed once and shared by the tactics it is in
+    transformed_techniques = {}
+
+    def techniques_in_tactic(tactic_id):
+        """Map a tactic_id to a structured tactic object including the (filtered) techniques in the tactic."""
+        nonlocal has_subtechniques
+
+        techniques = []
+        for index in incidence["tactic_techniques"][incidence["tactic_id_to_shortname"][tactic_id]]:
+            technique = incidence["techniques"][index]
+            if id(technique) not in platform_techniques:
+                continue
+
+            if index not in transformed_techniques:
+                transformed_techniques[index] = transform_technique(technique)
+            obj = transformed_techniques[index]
+
+            if "subtechniques" in obj:
                 has_subtechniques = True
-                nonlocal tour_technique
                 if tour_technique["subtechnique_count"] < 4 and tour_technique["subtechnique_count"] < len(
                     obj["subtechniques"]
                 ):
@@ -207,22 +309,13 @@ def get_sub_matrices(matrix):
                     tour_technique["tactic"] = tactic_id
                     tour_technique["subtechnique_count"] = len(obj["subtechniques"])
 
-        return obj
+            techniques.append(obj)
 
-    def techniques_in_tactic(tactic_id):
-        """helper function mapping a tactic_id
-        to a structured tactic object including the (filtered) techniques
-        in the tactic"""
-        # filter platform techniques to those inside of this tactic
-        techniques = list(
-            filter(lambda technique: tactic_id_to_shortname[tactic_id] in phase_names(technique), platform_techniques)
-        )
-        # transform into format required by matrix macro
-        return list(map(lambda t: transform_technique(t, tactic_id), techniques))
+        return techniques
 
     def transform_tactic(tactic_id):
-        """transform a tactic object into the format required by the matrix macro"""
-        tactic_obj = list(filter(lambda t: t["id"] == tactic_id, all_tactics))[0]
+        """Transform a tactic object into the format required by the matrix macro."""
+        tactic_obj = incidence["tactics"][tactic_id]
 
         attack_id = util.buildhelpers.get_attack_id(tactic_obj)
 
@@ -239,8 +332,7 @@ def get_sub_matrices(matrix):
         return obj
 
     data = []
-    sub_matrices = util.stixhelpers.get_matrices(domain_ms, matrix["matrix"])
-    for sub_matrix in sub_matrices:
+    for sub_matrix in incidence["sub_matrices"]:
         # find last modified date
         matrix_dates = util.buildhelpers.get_created_and_modified_dates(sub_matrix)
         matrix_timestamp = matrix_dates["modified"] if "modified" in matrix_dates else matrix_dates["created"]
@@ -261,11 +353,11 @@ def get_sub_matrices(matrix):
     return data, has_subtechniques, tour_technique
 
 
-def generate_sidebar_matrices(side_menu_data):
+def generate_sidebar_matrices():
     """Responsible for generating the sidebar for the matrices pages."""
     logger.info("Generating matrices sidebar")
     data = {}
-    data["menu"] = side_menu_data
+    data["side_nav"] = matrices_config.side_nav_key
 
     # Sidebar Overview
     sidebar_matrices_md = matrices_config.sidebar_matrices_md + json.dumps(data)
@@ -9,6 +9,9 @@ matrix_markdown_path = "content/pages/matrices/"
 # Path for templates
 matrices_templates_path = "modules/matrices/templates/"
 
+# Key of the side navigation shared by the pages of the module
+side_nav_key = "matrices"
+
 # Matrix overview string
 matrix_overview_md = (
     "Title: Matrix Overview \n"
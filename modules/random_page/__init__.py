@@ -1,6 +1,10 @@
+from modules import util
+
 from . import random_page
 from . import random_page_config
 
+util.htmlscanner.register_visitor(random_page_config.module_name, random_page_config.priority, random_page.collect_page)
+
 
 def get_priority():
     return random_page_config.priority
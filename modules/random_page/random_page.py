@@ -1,12 +1,16 @@
 import json
 import os
 import re
+from collections import defaultdict
 
-from modules import site_config
+from modules import site_config, util
 
+# Pages collected for the random page feature: route name => [path]
+route_pages = defaultdict(list)
 
-def generate_json():
-    json_data = {}
+
+def get_routes():
+    """Return the routes of the object pages for the random page feature, limited to the modules in the build."""
     all_routes = {
         "matrices": "Matrix",
         "tactics": "Tactic",
@@ -27,42 +31,14 @@ def generate_json():
     else:
         routes = all_routes
 
-    for root, __, files in os.walk("output"):
-        # only walk specified routes for object pages
-        for route, value in routes.items():
-            if value not in json_data.keys():
-                json_data[value] = []
-
-            if root.startswith(os.path.join(site_config.web_directory, route)):
-                for thefile in filter(lambda fname: fname.endswith(".html"), files):
-                    # Get the path of the html files only
-                    thepath = os.path.join(root, thefile)
-                    # Sanitize first; not all html files are suitable for this random page feature
-                    skipindex = check_skipindex(thepath)
-                    if not skipindex:
-                        add_to_json = False
-                        # Make sure the page isn't an object index page
-                        if route == "matrices":
-                            add_to_json = True
-                        elif route == "tactics" and re.search(r"TA[0-9]{4}", thepath):
-                            add_to_json = True
-                        elif route == "techniques" and re.search(r"T[0-9]{4}", thepath):
-                            add_to_json = True
-                        elif route == "datasources" and re.search(r"DS[0-9]{4}", thepath):
-                            add_to_json = True
-                        elif route == "mitigations" and re.search(r"M[0-9]{4}", thepath):
-                            add_to_json = True
-                        elif route == "groups" and re.search(r"G[0-9]{4}", thepath):
-                            add_to_json = True
-                        elif route == "software" and re.search(r"S[0-9]{4}", thepath):
-                            add_to_json = True
-                        elif route == "campaigns" and re.search(r"C[0-9]{4}", thepath):
-                            add_to_json = True
-                        elif route == "assets" and re.search(r"A[0-9]{4}", thepath):
-                            add_to_json = True
-
-                        if add_to_json:
-                            json_data[value].append(thepath[6:])
+    return routes
+
+
+def generate_json():
+    # Pages are collected by collect_page while the output is scanned
+    util.htmlscanner.scan_output()
+
+    json_data = {value: route_pages[value] for value in get_routes().values()}
 
     if not os.path.isdir(site_config.web_directory):
         os.makedirs(site_config.web_directory)
@@ -74,17 +50,41 @@ def generate_json():
     )
 
 
-def check_skipindex(filepath):
-    """clean the file of all HTML tags and unnecessary data"""
-    f = open(filepath, mode="r", encoding="utf8")
-    lines = f.readlines()
-    f.close()
+def collect_page(filepath, html_str):
+    """Add an output page to the random page options if it is an object page."""
+    root = os.path.dirname(filepath)
+
+    # only walk specified routes for object pages
+    for route, value in get_routes().items():
+        if root.startswith(os.path.join(site_config.web_directory, route)):
+            # Sanitize first; not all html files are suitable for this random page feature
+            skipindex = check_skipindex(html_str)
+            if not skipindex:
+                add_to_json = False
+                # Make sure the page isn't an object index page
+                if route == "matrices":
+                    add_to_json = True
+                elif route == "tactics" and re.search(r"TA[0-9]{4}", filepath):
+                    add_to_json = True
+                elif route == "techniques" and re.search(r"T[0-9]{4}", filepath):
+                    add_to_json = True
+                elif route == "datasources" and re.search(r"DS[0-9]{4}", filepath):
+                    add_to_json = True
+                elif route == "mitigations" and re.search(r"M[0-9]{4}", filepath):
+                    add_to_json = True
+                elif route == "groups" and re.search(r"G[0-9]{4}", filepath):
+                    add_to_json = True
+                elif route == "software" and re.search(r"S[0-9]{4}", filepath):
+                    add_to_json = True
+                elif route == "campaigns" and re.search(r"C[0-9]{4}", filepath):
+                    add_to_json = True
+                elif route == "assets" and re.search(r"A[0-9]{4}", filepath):
+                    add_to_json = True
+
+                if add_to_json:
+                    route_pages[value].append(filepath[6:])
 
-    skipindex = False
-    for line in lines:
-        if 'http-equiv="refresh"' in line:
-            skipindex = True
-        if '<meta name="robots" content="noindex, nofollow">' in line:
-            skipindex = True
 
-    return skipindex
+def check_skipindex(html_str):
+    """Return if the page should not be indexed, e.g. redirects and deprecated pages"""
+    return 'http-equiv="refresh"' in html_str or '<meta name="robots" content="noindex, nofollow">' in html_str
@@ -1,13 +1,25 @@
+import hashlib
+import json
 import os
-import uuid
+import re
 
+from loguru import logger
+
+import modules
 from modules import site_config, util
 
 from . import redirections_config
 
 
+def get_redirect_backend():
+    """Return the redirect backend selected with --redirect-backend or the REDIRECT_BACKEND environment variable."""
+    if site_config.args and getattr(site_config.args, "redirect_backend", None):
+        return site_config.args.redirect_backend
+    return redirections_config.redirect_backend
+
+
 def generate_redirections():
-    """Responsible for verifying redirects directory and starting off markdown generation process."""
+    """Responsible for collecting the redirects and writing them with the selected backend."""
     # Create content pages directory if does not already exist
     util.buildhelpers.create_content_pages_dir()
 
@@ -15,21 +27,30 @@ def generate_redirections():
     if not os.path.isdir(site_config.redirects_markdown_path):
         os.mkdir(site_config.redirects_markdown_path)
 
-    # Generate redirections
-    util.buildhelpers.generate_redirections(
-        redirections_filename=redirections_config.redirections_location, redirect_md=site_config.redirect_md_index
-    )
+    # from => to, the redirects of the modules (e.g. redirections.json) and the old ATT&CK IDs in the STIX
+    redirects = dict(modules.master_redirections_dict)
+    # from => title of the redirect page
+    titles = dict(modules.master_redirection_titles)
 
     for domain in site_config.domains:
         if domain["deprecated"] or (redirections_config.redirects_paths.get(domain["name"]) == None):
             continue
-        generate_markdown_files(domain["name"])
+        for from_path, to_path, title in get_stix_redirects(domain["name"]):
+            if from_path not in redirects:
+                redirects[from_path] = to_path
+                titles[from_path] = title
 
+    if get_redirect_backend() == "nginx":
+        generate_nginx_redirects(redirects)
+    else:
+        generate_redirect_pages(redirects, titles)
 
-def generate_markdown_files(domain):
-    """Given a domain, changes all the old links to new redirected links."""
+
+def get_stix_redirects(domain):
+    """Given a domain, return (from, to, title) for the old links of the objects in the domain."""
     # Reads the json attack STIX and creates a list of the ATT&CK Tactics
     ms = util.relationshipgetters.get_ms()
+    redirects = []
 
     for types in redirections_config.general_redirects_types:
         objs = util.stixhelpers.get_all_of_type(ms[domain], types)
@@ -44,26 +65,32 @@ def generate_markdown_files(domain):
                         revoked_attack_id = util.buildhelpers.get_attack_id(revoked_by_obj)
 
                         if revoked_attack_id:
-                            generate_obj_redirect(
-                                redirect_link=redirections_config.general_redirects_dict[types[0]],
-                                new_attack_id=revoked_attack_id,
-                                old_attack_id=old_attack_id,
-                                domain=domain,
-                            )
-
-                            if old_attack_id != new_attack_id:
-                                generate_obj_redirect(
+                            redirects.extend(
+                                get_obj_redirects(
                                     redirect_link=redirections_config.general_redirects_dict[types[0]],
                                     new_attack_id=revoked_attack_id,
-                                    old_attack_id=new_attack_id,
+                                    old_attack_id=old_attack_id,
                                     domain=domain,
                                 )
+                            )
+
+                            if old_attack_id != new_attack_id:
+                                redirects.extend(
+                                    get_obj_redirects(
+                                        redirect_link=redirections_config.general_redirects_dict[types[0]],
+                                        new_attack_id=revoked_attack_id,
+                                        old_attack_id=new_attack_id,
+                                        domain=domain,
+                                    )
+                                )
                 else:
-                    generate_obj_redirect(
-                        redirect_link=redirections_config.general_redirects_dict[types[0]],
-                        new_attack_id=new_attack_id,
-                        old_attack_id=old_attack_id,
-                        domain=domain,
+                    redirects.extend(
+                        get_obj_redirects(
+                            redirect_link=redirections_config.general_redirects_dict[types[0]],
+                            new_attack_id=new_attack_id,
+                            old_attack_id=old_attack_id,
+                            domain=domain,
+                        )
                     )
 
     if domain == "mobile-attack":
@@ -73,16 +100,18 @@ def generate_markdown_files(domain):
                 new_attack_id, old_attack_id = get_new_and_old_ids(obj)
 
                 if new_attack_id:
-                    generate_obj_redirect(
-                        redirections_config.mobile_redirect_dict[types[0]], new_attack_id, old_attack_id, domain
+                    redirects.extend(
+                        get_obj_redirects(
+                            redirections_config.mobile_redirect_dict[types[0]], new_attack_id, old_attack_id, domain
+                        )
                     )
 
+    return redirects
 
-def generate_obj_redirect(redirect_link, new_attack_id, old_attack_id, domain):
-    """Responsible for generating redirects markdown for given data."""
-    data = {}
 
-    data["title"] = old_attack_id + str(uuid.uuid1())
+def get_obj_redirects(redirect_link, new_attack_id, old_attack_id, domain):
+    """Return (from, to, title) of the old links of an object: its wiki link, and its old ID if it changed."""
+    title = old_attack_id
 
     # Check if new id or old id are subtechniques and change to redirection format
     if util.buildhelpers.is_sub_tid(new_attack_id):
@@ -91,23 +120,99 @@ def generate_obj_redirect(redirect_link, new_attack_id, old_attack_id, domain):
     if util.buildhelpers.is_sub_tid(old_attack_id):
         old_attack_id = util.buildhelpers.redirection_subtechnique(old_attack_id)
 
-    data["to"] = f"/{redirect_link['new']}/{new_attack_id}"
-    data["from"] = f"{redirections_config.redirects_paths[domain]}{redirect_link['old']}/{old_attack_id}"
+    to_path = f"/{redirect_link['new']}/{new_attack_id}"
+    redirects = [
+        (f"{redirections_config.redirects_paths[domain]}{redirect_link['old']}/{old_attack_id}", to_path, title)
+    ]
 
-    subs = site_config.redirect_md_index.substitute(data)
+    if new_attack_id != old_attack_id:
+        redirects.append((f"{redirect_link['new']}/{old_attack_id}", to_path, title))
 
-    redirect_file = os.path.join(site_config.redirects_markdown_path, f"{data['title']}.md")
-    with open(redirect_file, "w", encoding="utf8") as md_file:
-        md_file.write(subs)
+    return redirects
 
-    if new_attack_id != old_attack_id:
-        data["from"] = f"{redirect_link['new']}/{old_attack_id}"
 
-        subs = site_config.redirect_md_index.substitute(data)
+def get_redirect_markdown_path(from_path, markdown_paths=()):
+    """Return the markdown path of the redirect page of a path, named after the path so it is the same every build.
+
+    Paths that only differ in the characters replaced in the filename, e.g. a/b and a-b, would share a file: the
+    path that comes second in markdown_paths gets a short hash of the path in its filename.
+    """
+    filename = re.sub(r"[^\w.-]", "-", from_path.strip("/"))
+    redirect_file = os.path.join(
+        site_config.redirects_markdown_path, f"{redirections_config.redirect_filename_prefix}{filename}.md"
+    )
+
+    if redirect_file in markdown_paths:
+        path_hash = hashlib.sha256(from_path.encode("utf8")).hexdigest()[:8]
+        redirect_file = os.path.join(
+            site_config.redirects_markdown_path,
+            f"{redirections_config.redirect_filename_prefix}{filename}-{path_hash}.md",
+        )
+
+    return redirect_file
+
+
+def generate_redirect_pages(redirects, titles):
+    """Write a markdown file for each redirect, Pelican renders them into meta refresh pages."""
+    markdown_paths = set()
+
+    for from_path, to_path in sorted(redirects.items()):
+        data = {"title": titles.get(from_path, from_path), "from": from_path.strip("/"), "to": to_path}
+        redirect_file = get_redirect_markdown_path(from_path, markdown_paths)
+        markdown_paths.add(redirect_file)
+
+        if util.buildmanifest.is_page_current(
+            key=redirect_file,
+            markdown_paths=[redirect_file],
+            dependencies=util.buildmanifest.get_dependencies([], [], data),
+            module=redirections_config.module_name,
+        ):
+            continue
 
-        redirect_file = os.path.join(site_config.redirects_markdown_path, f"{redirect_link['new']}{data['title']}.md")
         with open(redirect_file, "w", encoding="utf8") as md_file:
-            md_file.write(subs)
+            md_file.write(site_config.redirect_md_index.substitute(data))
+
+    # Redirect pages of builds before the redirect files were named after their path
+    for filename in os.listdir(site_config.redirects_markdown_path):
+        markdown_path = os.path.join(site_config.redirects_markdown_path, filename)
+        if markdown_path not in markdown_paths and os.path.isfile(markdown_path):
+            os.remove(markdown_path)
+
+
+def get_site_path(path):
+    """Return the path of a page of the site, under the subdirectory the site is built for."""
+    if site_config.subdirectory and path.startswith("/"):
+        return f"/{site_config.subdirectory}{path}"
+    return path
+
+
+def generate_nginx_redirects(redirects):
+    """Write the redirects as nginx map entries and as a JSON table, instead of a page for each redirect.
+
+    nginx.conf includes the map entries, so the web server answers the old links with a 301.
+    """
+    redirects_directory = os.path.join(site_config.web_directory, redirections_config.nginx_redirects_directory)
+    if not os.path.isdir(redirects_directory):
+        os.makedirs(redirects_directory)
+
+    # Pages of the other backend would still be rendered
+    for filename in os.listdir(site_config.redirects_markdown_path):
+        os.remove(os.path.join(site_config.redirects_markdown_path, filename))
+
+    table = {}
+    for from_path, to_path in sorted(redirects.items()):
+        table[get_site_path("/" + from_path.strip("/"))] = get_site_path(to_path)
+
+    with open(os.path.join(redirects_directory, redirections_config.nginx_redirects_map), "w", encoding="utf8") as f:
+        for from_path, to_path in table.items():
+            # The pages were saved as <from>/index.html, so the old links work with and without the index
+            for from_variant in [from_path, f"{from_path}/", f"{from_path}/index.html"]:
+                f.write(f'"{from_variant}" "{to_path}";\n')
+
+    with open(os.path.join(redirects_directory, redirections_config.nginx_redirects_json), "w", encoding="utf8") as f:
+        json.dump(table, f, separators=(",", ":"))
+
+    logger.info(f"Wrote {len(table)} redirects to {redirects_directory}")
 
 
 def get_new_and_old_ids(obj):
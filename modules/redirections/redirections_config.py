@@ -1,3 +1,5 @@
+import os
+
 module_name = "redirections"
 priority = 8.2
 
@@ -21,3 +23,15 @@ mobile_redirect_types_dict = [["course-of-action"]]
 
 # File paths dictionary
 redirects_paths = {"enterprise-attack": "wiki/", "mobile-attack": "mobile/index.php/"}
+
+# Redirect backend: "pages" renders a meta refresh page for each redirect, "nginx" writes a map include
+redirect_backend = os.getenv("REDIRECT_BACKEND", "pages")
+redirect_backends = ["pages", "nginx"]
+
+# Prefix of the redirect markdown files, they are named after the path they redirect from
+redirect_filename_prefix = "redirect-"
+
+# Output directory of the nginx backend, with the map entries and the same redirects as a JSON table
+nginx_redirects_directory = "redirects"
+nginx_redirects_map = "redirects.map"
+nginx_redirects_json = "redirects.json"
@@ -1,6 +1,10 @@
+from modules import util
+
 from . import search
 from . import search_config
 
+util.htmlscanner.register_visitor(search_config.module_name, search_config.priority, search.index_page)
+
 
 def get_priority():
     return search_config.priority
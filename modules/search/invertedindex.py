@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+from collections import defaultdict
+
+from loguru import logger
+
+from . import search_config
+
+term_regex = re.compile(r"\w+")
+# Shard keys that can be used as filenames as they are, other prefixes are hex-encoded
+plain_shard_key_regex = re.compile(r"^[a-z0-9]+$")
+
+
+def tokenize(text, min_length=1):
+    """Return the lowercase terms of a text."""
+    return [term for term in term_regex.findall(text.lower()) if len(term) >= min_length]
+
+
+def get_shard_key(term):
+    """Return the key of the shard that holds the given term."""
+    prefix = term[: search_config.shard_prefix_length]
+    if plain_shard_key_regex.match(prefix):
+        return prefix
+    return "_" + prefix.encode("utf8").hex()
+
+
+def build_postings(documents):
+    """Return term => [[document id, score]], sorted by score and then by document id.
+
+    A term scores one point per occurrence in the content of a page and title_boost per occurrence in its title.
+    """
+    scores = defaultdict(lambda: defaultdict(int))
+
+    for document in documents:
+        for term in tokenize(document["title"]):
+            scores[term][document["id"]] += search_config.title_boost
+        for term in tokenize(document["content"], search_config.min_content_term_length):
+            scores[term][document["id"]] += 1
+
+    return {
+        term: sorted([[doc_id, score] for doc_id, score in postings.items()], key=lambda k: (-k[1], k[0]))
+        for term, postings in scores.items()
+    }
+
+
+def write_hashed_json(directory, name, data):
+    """Write data as JSON to <name>.<content hash>.json and return the filename."""
+    content = json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode("utf8")
+    content_hash = hashlib.sha256(content).hexdigest()[: search_config.filename_hash_length]
+
+    filename = f"{name}.{content_hash}.json"
+    with open(os.path.join(directory, filename), "wb") as f:
+        f.write(content)
+
+    return filename
+
+
+def write_inverted_index(search_directory, documents):
+    """Write a prebuilt inverted index of the documents, sharded by term prefix.
+
+    The manifest lists the content-hashed filenames of the document table and of each shard, so the
+    shards can be cached indefinitely and a client only fetches the shards of the terms it looks up.
+    """
+    index_directory = os.path.join(search_directory, search_config.inverted_index_directory)
+
+    # Shards of previous builds have other hashes in their names
+    if os.path.isdir(index_directory):
+        shutil.rmtree(index_directory)
+    os.makedirs(index_directory)
+
+    documents = sorted(documents, key=lambda k: k["id"])
+    postings = build_postings(documents)
+
+    shards = defaultdict(dict)
+    for term in sorted(postings):
+        shards[get_shard_key(term)][term] = postings[term]
+
+    manifest = {
+        "version": search_config.inverted_index_version,
+        "shard_prefix_length": search_config.shard_prefix_length,
+        "title_boost": search_config.title_boost,
+        "min_content_term_length": search_config.min_content_term_length,
+        "documents": write_hashed_json(
+            index_directory,
+            "documents",
+            {document["id"]: {"title": document["title"], "path": document["path"]} for document in documents},
+        ),
+        "shards": {key: write_hashed_json(index_directory, key, shards[key]) for key in sorted(shards)},
+    }
+
+    with open(os.path.join(index_directory, search_config.inverted_index_manifest), "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Wrote inverted search index: {len(postings)} terms in {len(shards)} shards")
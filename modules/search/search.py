@@ -1,14 +1,23 @@
 import html
+import io
 import json
 import os
 import re
 from collections import defaultdict
+from html.parser import HTMLParser
 
-import bleach
 from loguru import logger
 
 import modules
-from modules import site_config
+from modules import site_config, util
+
+from . import invertedindex, search_config
+
+# bleach is optional - only needed by the line-based text extractor
+try:
+    import bleach
+except ImportError:
+    bleach = None
 
 # versions module is optional - may be disabled
 try:
@@ -23,60 +32,20 @@ sub_types_hash = set(sub_types)
 dist_words = 0
 
 
+# Pages collected for the searchable index: file type => [page]
+index_data = defaultdict(list)
+global_id_counter = 0
+
+# Pages whose text is extracted by worker processes once the output was scanned: (filepath, html_str)
+pending_pages = []
+
+
 def generate_index():
     logger.info("Creating searchable index for the site")
-    index_data = defaultdict(list)
-    global_id_counter = 0
-
-    for root, __, files in os.walk(site_config.web_directory):
-        skip = False
-        for versions_dir in ["previous", "versions"]:
-            if root.startswith(os.path.join(site_config.web_directory, versions_dir)):
-                skip = True
-        if skip:
-            continue
-
-        for html_file in filter(lambda filename: filename.endswith(".html"), files):
-            absolute_path = os.path.join(root, html_file)
-            cleancontent, skipindex, title = clean(absolute_path)
-
-            path = absolute_path[6:]
-
-            if path.startswith("/mitigations/"):
-                file_type = "mitigations"
-            elif path.startswith("/assets/"):
-                file_type = "assets"
-            elif path.startswith("/matrices/"):
-                file_type = "matrices"
-            elif path.startswith("/groups/"):
-                file_type = "groups"
-            elif path.startswith("/campaigns/"):
-                file_type = "campaigns"
-            elif path.startswith("/datacomponents/"):
-                file_type = "datacomponents"
-            elif path.startswith("/software/"):
-                file_type = "software"
-            elif path.startswith("/tactics/"):
-                file_type = "tactics"
-            elif path.startswith("/techniques/"):
-                file_type = "techniques"
-            elif path.startswith("/detectionstrategies/"):
-                file_type = "detectionstrategies"
-            elif path.startswith("/analytics/"):
-                file_type = "analytics"
-            else:
-                file_type = "misc"
-
-            if not skipindex:
-                index_data[file_type].append(
-                    {
-                        "id": global_id_counter,
-                        "title": title,
-                        "path": path,
-                        "content": cleancontent,
-                    }
-                )
-                global_id_counter += 1
+
+    # Pages are collected by index_page while the output is scanned
+    util.htmlscanner.scan_output()
+    index_pending_pages()
 
     if not os.path.isdir(site_config.web_directory):
         os.makedirs(site_config.web_directory)
@@ -87,25 +56,99 @@ def generate_index():
     if not os.path.exists(searchable_pages):
         os.makedirs(searchable_pages)
 
-    for file_type, data in index_data.items():
-        json.dump(data, open(os.path.join(searchable_pages, f"{file_type}.json"), mode="w", encoding="utf8"), indent=0)
+    with util.profiler.stage("Search index"):
+        for file_type, data in index_data.items():
+            json.dump(
+                data, open(os.path.join(searchable_pages, f"{file_type}.json"), mode="w", encoding="utf8"), indent=0
+            )
 
-    if site_config.subdirectory:
-        search_file_path = os.path.join(site_config.web_directory, "theme", "scripts", "search_bundle.js")
+        invertedindex.write_inverted_index(
+            searchable_pages, [document for data in index_data.values() for document in data]
+        )
 
-        if os.path.exists(search_file_path):
-            search_contents = ""
-
-            with open(search_file_path, mode="r", encoding="utf8") as search_file:
-                search_contents = search_file.read()
-                search_contents = re.sub(
-                    'site_base_url ?= ? ""', f'site_base_url = "/{site_config.subdirectory}/"', search_contents
-                )
+    preserve_current_version()
 
-            with open(search_file_path, mode="w", encoding="utf8") as search_file:
-                search_file.write(search_contents)
 
-    preserve_current_version()
+def index_page(filepath, html_str):
+    """Add an output page to the searchable index."""
+    root = os.path.dirname(filepath)
+    for versions_dir in ["previous", "versions"]:
+        if root.startswith(os.path.join(site_config.web_directory, versions_dir)):
+            return
+
+    if util.buildhelpers.get_jobs() > 1:
+        pending_pages.append((filepath, html_str))
+    else:
+        add_to_index(filepath, *clean(html_str))
+
+
+def index_pending_pages():
+    """Extract the text of the pages collected for the worker processes and add them to the index in scan order."""
+    global pending_pages
+
+    if not pending_pages:
+        return
+
+    pool = util.buildhelpers.get_process_pool()
+    if pool:
+        logger.info(f"Extracting the text of {len(pending_pages)} pages with {util.buildhelpers.get_jobs()} workers")
+        with pool:
+            results = list(pool.map(clean_page_job, range(len(pending_pages)), chunksize=32))
+    else:
+        results = [clean(html_str) for _, html_str in pending_pages]
+
+    for (filepath, _), result in zip(pending_pages, results):
+        add_to_index(filepath, *result)
+
+    pending_pages = []
+
+
+def clean_page_job(index):
+    """Extract the text of one collected page in a worker process."""
+    return clean(pending_pages[index][1])
+
+
+def add_to_index(filepath, cleancontent, skipindex, title):
+    """Add the extracted text of an output page to the index data of its file type."""
+    global global_id_counter
+
+    path = filepath[6:]
+
+    if path.startswith("/mitigations/"):
+        file_type = "mitigations"
+    elif path.startswith("/assets/"):
+        file_type = "assets"
+    elif path.startswith("/matrices/"):
+        file_type = "matrices"
+    elif path.startswith("/groups/"):
+        file_type = "groups"
+    elif path.startswith("/campaigns/"):
+        file_type = "campaigns"
+    elif path.startswith("/datacomponents/"):
+        file_type = "datacomponents"
+    elif path.startswith("/software/"):
+        file_type = "software"
+    elif path.startswith("/tactics/"):
+        file_type = "tactics"
+    elif path.startswith("/techniques/"):
+        file_type = "techniques"
+    elif path.startswith("/detectionstrategies/"):
+        file_type = "detectionstrategies"
+    elif path.startswith("/analytics/"):
+        file_type = "analytics"
+    else:
+        file_type = "misc"
+
+    if not skipindex:
+        index_data[file_type].append(
+            {
+                "id": global_id_counter,
+                "title": title,
+                "path": path,
+                "content": cleancontent,
+            }
+        )
+        global_id_counter += 1
 
 
 skiplines = ["breadcrumb-item", "nav-link"]
@@ -129,10 +172,137 @@ def clean_line(line):
     return line
 
 
-def clean(filepath):
-    """Clean the file of all HTML tags and unnecessary data."""
-    with open(filepath, mode="r", encoding="utf8") as f:
-        lines = f.readlines()
+# Markers around the part of a page that is indexed
+start_indexing_marker = "start-indexing-for-search"
+stop_indexing_marker = "stop-indexing-for-search"
+
+# Pages that contain one of these are left out of the index: redirects and deprecated objects
+skipindex_markers = ['http-equiv="refresh"', '<h5 class="mb-0">Deprecation Warning</h5>']
+
+# e.g [Credential Access - Enterprise | MITRE ATT&CK&trade;] becomes [Credential Access - Enterprise]
+title_regex = re.compile(r"<title>(.*)\|.*</title>")
+whitespace_regex = re.compile(r"[\n ]+")
+
+# Block level tags are replaced with a newline when they are stripped, as bleach does (HTML_TAGS_BLOCK_LEVEL)
+block_level_tags = frozenset(
+    (
+        "address article aside blockquote dd details dialog div dl dt fieldset figcaption figure footer form "
+        "h1 h2 h3 h4 h5 h6 header hgroup hr li main nav ol p pre section table ul"
+    ).split()
+)
+
+
+class SearchTextExtractor(HTMLParser):
+    """Collect the text between the indexing markers of a page in a single pass over its tokens.
+
+    Like the line-based bleach extraction, the line of the start marker is left out, the line of the
+    stop marker is included and lines with a breadcrumb or navigation link tag are skipped.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # (line, text, kind) of every text node, split at newlines, and of every tag or comment
+        self.tokens = []
+        # Lines with a tag that is left out of the index
+        self.skipped_lines = set()
+        # [first line, last line] of the indexed parts of the page, the last line is None until the stop marker
+        self.indexed_ranges = []
+
+    def handle_starttag(self, tag, attrs):
+        """Record a start tag and the line it is on if the tag is left out of the index."""
+        line = self.getpos()[0]
+        self.tokens.append((line, "", "block" if tag in block_level_tags else "tag"))
+
+        start_tag = self.get_starttag_text()
+        if any(skip in start_tag for skip in skiplines):
+            self.skipped_lines.add(line)
+
+    def handle_endtag(self, tag):
+        """Record an end tag."""
+        self.tokens.append((self.getpos()[0], "", "tag"))
+
+    def handle_comment(self, data):
+        """Record a comment and open or close an indexed part of the page at the indexing markers."""
+        line = self.getpos()[0]
+        self.tokens.append((line, "", "tag"))
+        indexing = self.indexed_ranges and self.indexed_ranges[-1][1] is None
+
+        if data == start_indexing_marker and not indexing:
+            self.indexed_ranges.append([line + 1, None])
+        elif data == stop_indexing_marker and indexing:
+            self.indexed_ranges[-1][1] = line
+
+    def handle_data(self, data):
+        """Record a text node, one token for each of its lines."""
+        line = self.getpos()[0]
+        for text in data.splitlines(keepends=True):
+            self.tokens.append((line, text, "data"))
+            line += 1
+
+    def is_indexed(self, line):
+        """Return if the given line is in an indexed part of the page and isn't skipped."""
+        if line in self.skipped_lines:
+            return False
+        return any(first <= line and (last is None or line <= last) for first, last in self.indexed_ranges)
+
+    def get_text(self):
+        """Return the collected text of the indexed lines."""
+        text = []
+        tag_seen = False
+        for line, data, kind in self.tokens:
+            if not self.is_indexed(line):
+                continue
+
+            if kind == "data":
+                text.append(data)
+            else:
+                # Block level tags only become newlines after the first tag
+                if kind == "block" and tag_seen:
+                    text.append("\n")
+                tag_seen = True
+
+        return "".join(text)
+
+
+def clean(html_str):
+    """Clean the page of all HTML tags and unnecessary data, return (content, skipindex, title)."""
+    # The parser is used when bleach isn't installed
+    if search_config.text_extractor == "bleach" and bleach:
+        return clean_with_bleach(html_str)
+
+    if any(marker in html_str for marker in skipindex_markers):
+        return "", True, ""
+
+    title = ""
+    match = title_regex.search(html_str)
+    if match:
+        title = match.group(1).strip()
+
+    # Only the lines from the first start marker to the last stop marker can be indexed
+    start = html_str.find(f"<!--{start_indexing_marker}-->")
+    if start == -1:
+        return "", True, title
+    start = html_str.rfind("\n", 0, start) + 1
+
+    end = html_str.rfind(f"<!--{stop_indexing_marker}-->")
+    if end < html_str.rfind(f"<!--{start_indexing_marker}-->"):
+        # Indexing isn't stopped before the end of the page
+        end = len(html_str)
+    else:
+        end = html_str.find("\n", end) + 1 or len(html_str)
+
+    extractor = SearchTextExtractor()
+    extractor.feed(html_str[start:end])
+    extractor.close()
+
+    out = whitespace_regex.sub(" ", clean_line(extractor.get_text()))
+    skipindex = out == "" or out == " "
+    return out, skipindex, title
+
+
+def clean_with_bleach(html_str):
+    """Clean the page of all HTML tags and unnecessary data line by line with bleach."""
+    lines = io.StringIO(html_str).readlines()
 
     content = ""
     count = 0
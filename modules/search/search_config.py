@@ -1,2 +1,20 @@
+import os
+
 module_name = "Search"
 priority = 17
+
+# Extracts the text of the pages for the index: "parser" (html.parser tokenizer) or "bleach" (line by line)
+text_extractor = os.getenv("SEARCH_TEXT_EXTRACTOR", "parser")
+
+# Prebuilt inverted index, written to the index directory of the search output
+inverted_index_directory = "index"
+inverted_index_manifest = "manifest.json"
+inverted_index_version = 1
+# Terms are sharded by their first characters, a query only needs the shards of its terms
+shard_prefix_length = 2
+# Weight of a term found in the title of a page, relative to one occurrence in the content
+title_boost = 10
+# Shorter terms are not indexed from the page content, titles are indexed in full
+min_content_term_length = 3
+# Length of the content hash in the shard filenames
+filename_hash_length = 12
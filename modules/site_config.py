@@ -28,6 +28,9 @@ domains = [
     {"name": "tfa-attack", "location": STIX_LOCATION_TFA, "alias": "TFA", "deprecated": False},
 ]
 
+# Object store used to load the domain bundles: "memory" (stix2.MemoryStore) or "compact" (indexed, lazily parsed)
+STIX_STORE = os.getenv("STIX_STORE", "memory")
+
 # Directory for attack version archives
 default_archive_dir = "attack-version-archives"
 ATTACK_VERSION_ARCHIVES = os.getenv("ATTACK_VERSION_ARCHIVES", default_archive_dir)
@@ -113,6 +116,9 @@ navigator_link = ""
 # Content directory
 content_dir = "content/"
 
+# Side navigation trees, written once per module and referenced by key from the pages
+side_nav_dir = "content/side-nav/"
+
 # Pelican pages directory
 pages_dir = "content/pages"
 
@@ -166,6 +172,9 @@ navigator_version = "5.2.0"
 # Directory for test reports
 test_report_directory = "reports"
 
+# Directory for data kept between builds, e.g. the manifest used by incremental builds
+cache_directory = ".build-cache"
+
 # Workbench credentials to use if pulling STIX from ATT&CK Workbench version 1.2.0 or later
 WORKBENCH_USER = os.getenv("WORKBENCH_USER")
 WORKBENCH_API_KEY = os.getenv("WORKBENCH_API_KEY")
@@ -1,6 +1,15 @@
+from pelican import signals
+
+from modules import util
+
 from . import subdirectory
 from . import subdirectory_config
 
+util.htmlscanner.register_visitor(
+    subdirectory_config.module_name, subdirectory_config.priority, subdirectory.replace_links
+)
+signals.get_writer.connect(subdirectory.get_writer)
+
 
 def get_priority():
     return subdirectory_config.priority
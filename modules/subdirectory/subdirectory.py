@@ -1,51 +1,109 @@
 import os
 import re
 
-from modules import site_config
+from pelican.writers import Writer
+
+import modules
+from modules import site_config, util
+
+from . import subdirectory_config
+
+allowed_in_link = r"-?\w\$\.!\*'()/"
+
+# Pages whose links were prefixed when Pelican wrote them
+prefixed_pages = set()
+
+# (src/href pattern, meta refresh pattern) for the subdirectory of the build, compiled on first use
+link_regexes = None
 
 
 def generate_subdirectory():
     """Build website to subdirectory"""
 
     if site_config.args.subdirectory:
-        replace()
+        # Pages rendered by Pelican were prefixed as they were written, the others are prefixed by replace_links
+        # while the output is scanned
+        util.htmlscanner.scan_output()
 
 
-allowed_in_link = r"-?\w\$\.!\*'()/"
+def is_enabled():
+    """Return if the links of the site are prefixed with the subdirectory in this build."""
+    if not site_config.args or not site_config.args.subdirectory:
+        return False
+    return any(ptr["module_name"] == subdirectory_config.module_name for ptr in modules.run_ptr)
+
+
+def get_link_regexes():
+    """Return the patterns of the in-site links that are not prefixed with the subdirectory yet."""
+    global link_regexes
+
+    if link_regexes is None:
+        not_prefixed = f"(?!/{re.escape(site_config.subdirectory)}/)"
+        link_regexes = (
+            re.compile(f"(src|href)=[\"']{not_prefixed}([{allowed_in_link}]+)[\"']"),
+            re.compile(f'content="0; url={not_prefixed}([{allowed_in_link}]+)["\']'),
+        )
+
+    return link_regexes
+
 
-def replace_links(filepath):
-    """In the given file, replace the in-site links to reference
+def prefix_links(html_str):
+    """In the given page, prefix the in-site links with the subdirectory."""
+    link_regex, redirection_regex = get_link_regexes()
+
+    html_str = link_regex.sub(rf'\g<1>="/{site_config.subdirectory}\g<2>"', html_str)
+    html_str = redirection_regex.sub(rf'content="0; url=/{site_config.subdirectory}\g<1>"', html_str)
+
+    return html_str
+
+
+def replace_links(filepath, html_str):
+    """In the given page, replace the in-site links to reference
     the correct previous version
     """
+    if not site_config.args.subdirectory or os.path.normpath(filepath) in prefixed_pages:
+        return None
+
+    return prefix_links(html_str)
+
 
-    # read file contents
-    with open(filepath, mode="r", encoding="utf8") as html:
-        html_str = html.read()
+class LinkPrefixingFile:
+    """Page opened by SubdirectoryWriter, the links of the HTML written to it are prefixed with the subdirectory."""
 
-    # subdirectory link format
-    dest_link_format = rf"/{site_config.subdirectory}\g<1>"
+    def __init__(self, html_file):
+        self.html_file = html_file
 
-    def substitute(prefix, html_str):
-        from_str = f"{prefix}=[\"']([{allowed_in_link}]+)[\"']"
-        to_str = f'{prefix}="{dest_link_format}"'
-        return re.sub(from_str, to_str, html_str)
+    def write(self, html_str):
+        """Write the HTML of a page with its in-site links prefixed with the subdirectory."""
+        return self.html_file.write(prefix_links(html_str))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.html_file.close()
+
+
+class SubdirectoryWriter(Writer):
+    """Pelican writer that prefixes the links of the pages with the subdirectory as they are rendered.
+
+    Pages don't have to be read and written again after the Pelican render.
+    """
 
-    def substitute_redirection(prefix, html_str):
-        from_str = f"{prefix}=([{allowed_in_link}]+)[\"']"
-        to_str = f'{prefix}={dest_link_format}"'
-        return re.sub(from_str, to_str, html_str)
+    # _open_w is private to Pelican, it is the one method every page write goes through. The signature is the one of
+    # Pelican 4.10 (pelican==4.10.2 in requirements.txt), check it again when upgrading Pelican
+    def _open_w(self, filename, encoding, override=False):
+        html_file = super()._open_w(filename, encoding, override=override)
 
-    html_str = substitute("src", html_str)
-    html_str = substitute("href", html_str)
-    html_str = substitute_redirection('content="0; url', html_str)
+        if not filename.endswith(".html"):
+            return html_file
 
-    with open(filepath, mode="w", encoding="utf8") as updated_html:
-        updated_html.write(html_str)
+        prefixed_pages.add(os.path.normpath(os.path.relpath(filename)))
+        return LinkPrefixingFile(html_file)
 
 
-def replace():
-    """Replace local hyperlinks with subdirectory"""
-    for directory, _, files in os.walk(site_config.web_directory):
-        for filename in filter(lambda f: f.endswith(".html"), files):
-            filepath = os.path.join(directory, filename)
-            replace_links(filepath)
+def get_writer(pelican_object):
+    """Return the Pelican writer of subdirectory builds, receiver of the get_writer signal."""
+    if is_enabled():
+        return SubdirectoryWriter
+    return None
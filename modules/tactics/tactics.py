@@ -37,14 +37,14 @@ def generate_tactics():
         )
         tactics[domain["name"]] = util.stixhelpers.get_tactic_list(ms[domain["name"]], domain["name"])
 
+    # The side navigation is written once, the pages reference it by key
     side_nav_data = util.buildhelpers.get_side_nav_domains_data("tactics", tactics)
-    generate_sidebar_tactics(side_nav_data)
+    util.buildhelpers.write_side_nav_data(tactics_config.side_nav_key, side_nav_data)
+    generate_sidebar_tactics()
 
     for domain in site_config.domains:
         deprecated = True if domain["deprecated"] else False
-        check_if_generated = generate_domain_markdown(
-            domain["name"], techniques_no_sub, tactics, side_nav_data, notes, deprecated
-        )
+        check_if_generated = generate_domain_markdown(domain["name"], techniques_no_sub, tactics, notes, deprecated)
         if not tactic_generated:
             if check_if_generated:
                 tactic_generated = True
@@ -53,13 +53,13 @@ def generate_tactics():
         util.buildhelpers.remove_module_from_menu(tactics_config.module_name)
 
 
-def generate_domain_markdown(domain, techniques, tactics, side_nav_data, notes, deprecated=None):
+def generate_domain_markdown(domain, techniques, tactics, notes, deprecated=None):
     """Generate tactic index markdown for each domain and generates shared data for tactics."""
     if tactics[domain]:
         # Write out the markdown file for overview of domain
         data = {"domain": domain.split("-")[0], "tactics_list_len": str(len(tactics[domain]))}
 
-        data["side_menu_data"] = side_nav_data
+        data["side_nav"] = tactics_config.side_nav_key
         data["tactics_table"] = get_domain_table_data(tactics[domain])
 
         if deprecated:
@@ -78,15 +78,41 @@ def generate_domain_markdown(domain, techniques, tactics, side_nav_data, notes,
             i_md_file.write(tactics_config.tactic_overview_md)
 
         # Create the markdown for the enterprise groups in the STIX
-        for tactic in tactics[domain]:
-            generate_tactic_md(tactic, domain, tactics, techniques, side_nav_data, notes)
+        with util.profiler.stage("Tactic markdown"):
+            for tactic in tactics[domain]:
+                # Pages of tactics whose inputs did not change since the previous build are kept as they are
+                if not is_tactic_current(tactic, domain, techniques):
+                    generate_tactic_md(tactic, domain, tactics, techniques, notes)
 
         return True
 
     return False
 
 
-def generate_tactic_md(tactic, domain, tactic_list, techniques, side_nav_data, notes):
+def is_tactic_current(tactic, domain, techniques):
+    """Return if the page of a tactic is unchanged since the previous build."""
+    attack_id = util.buildhelpers.get_attack_id(tactic)
+    if not attack_id:
+        return False
+
+    # The tactic page lists the techniques of the tactic and their sub-techniques
+    subtechniques_of = util.relationshipgetters.get_subtechniques_of()
+    listed_ids = []
+    for technique in techniques[domain]:
+        listed_ids.append(technique["id"])
+        listed_ids.extend(subtechnique["object"]["id"] for subtechnique in subtechniques_of.get(technique["id"], []))
+
+    markdown_path = os.path.join(tactics_config.tactics_markdown_path, attack_id + ".md")
+
+    return util.buildmanifest.is_page_current(
+        key=markdown_path,
+        markdown_paths=[markdown_path],
+        dependencies=util.buildmanifest.get_dependencies([tactic["id"]], listed_ids),
+        module=tactics_config.module_name,
+    )
+
+
+def generate_tactic_md(tactic, domain, tactic_list, techniques, notes):
     """Generate markdown for given tactic."""
     attack_id = util.buildhelpers.get_attack_id(tactic)
 
@@ -99,7 +125,7 @@ def generate_tactic_md(tactic, domain, tactic_list, techniques, side_nav_data, n
         data["attack_id"] = attack_id
         data["name"] = tactic["name"]
         data["name_lower"] = tactic["name"].lower()
-        data["side_menu_data"] = side_nav_data
+        data["side_nav"] = tactics_config.side_nav_key
         data["domain"] = domain.split("-")[0]
         data["notes"] = notes.get(tactic["id"])
 
@@ -177,11 +203,11 @@ def get_techniques_of_tactic(tactic, techniques):
     return techniques_list
 
 
-def generate_sidebar_tactics(side_nav_data):
+def generate_sidebar_tactics():
     """Responsible for generating the sidebar for the tactics pages."""
     logger.info("Generating tactics sidebar")
     data = {}
-    data["menu"] = side_nav_data
+    data["side_nav"] = tactics_config.side_nav_key
 
     # Sidebar Overview
     sidebar_tactics_md = tactics_config.sidebar_tactics_md + json.dumps(data)
@@ -9,6 +9,9 @@ tactics_markdown_path = "content/pages/tactics/"
 # Path for templates
 tactics_templates_path = "modules/tactics/templates/"
 
+# Key of the side navigation shared by the pages of the module
+side_nav_key = "tactics"
+
 # String template for domains
 tactic_domain_md = Template(
     "Title: Tactics\nTemplate: tactics/tactics-domain-index\nsave_as: tactics/${domain}/index.html\ndata: "
@@ -8,6 +8,21 @@ from modules import site_config, util
 
 from . import techniques_config
 
+# List properties of a technique that are sorted in place when its page is generated
+technique_sorted_properties = [
+    "x_mitre_platforms",
+    "x_mitre_system_requirements",
+    "x_mitre_permissions_required",
+    "x_mitre_effective_permissions",
+    "x_mitre_impact_type",
+    "x_mitre_defense_bypassed",
+    "x_mitre_contributors",
+    "x_mitre_tactic_type",
+]
+
+# Arguments of generate_technique_md for each technique, read by the forked worker processes
+technique_md_args = []
+
 
 def generate_techniques():
     """Generate techniques, return True if technique was generated, False if nothing was generated."""
@@ -42,22 +57,22 @@ def generate_techniques():
         )
         tactics[domain["name"]] = util.stixhelpers.get_tactic_list(src=ms[domain["name"]], domain=domain["name"])
 
+    # The side navigation is written once, the pages reference it by key
     side_nav_data = get_technique_side_nav_data(techniques_no_sub, tactics)
+    util.buildhelpers.write_side_nav_data(techniques_config.side_nav_key, side_nav_data)
 
     for domain in site_config.domains:
         deprecated = True if domain["deprecated"] else False
-        check_if_generated = generate_domain_markdown(
-            domain["name"], techniques_no_sub, tactics, side_nav_data, notes, deprecated
-        )
+        check_if_generated = generate_domain_markdown(domain["name"], techniques_no_sub, tactics, notes, deprecated)
         if not technique_generated and check_if_generated:
             technique_generated = True
 
-    generate_sidebar_techniques(side_nav_data)
+    generate_sidebar_techniques()
     if not technique_generated:
         util.buildhelpers.remove_module_from_menu(techniques_config.module_name)
 
 
-def generate_domain_markdown(domain, techniques_no_sub, tactics, side_nav_data, notes, deprecated=None):
+def generate_domain_markdown(domain, techniques_no_sub, tactics, notes, deprecated=None):
     """Generate technique index markdown for each domain and generates shared data for techniques."""
     # Check if there is at least one technique
     if techniques_no_sub[domain]:
@@ -73,7 +88,7 @@ def generate_domain_markdown(domain, techniques_no_sub, tactics, side_nav_data,
         data["subtechniques_len"] = util.buildhelpers.get_subtechnique_count(technique_list_no_sub_no_deprecated)
 
         # Get tactic-techniques table
-        data["menu"] = side_nav_data
+        data["side_nav"] = techniques_config.side_nav_key
 
         if deprecated:
             data["deprecated"] = deprecated
@@ -89,16 +104,126 @@ def generate_domain_markdown(domain, techniques_no_sub, tactics, side_nav_data,
 
         # Create the markdown for techniques in the STIX
         datasource_of = util.relationshipgetters.get_datasource_of()
-        for technique in techniques_no_sub[domain]:
-            if "revoked" not in technique or technique["revoked"] is False:
-                generate_technique_md(technique, domain, side_nav_data, tactics[domain], notes, datasource_of)
+        techniques = [
+            technique
+            for technique in techniques_no_sub[domain]
+            if "revoked" not in technique or technique["revoked"] is False
+        ]
+        with util.profiler.stage("Technique markdown"):
+            generate_techniques_md(techniques, domain, tactics[domain], notes, datasource_of)
 
         return True
 
     return False
 
 
-def generate_technique_md(technique, domain, side_nav_data, tactic_list, notes, datasource_of):
+def generate_techniques_md(techniques, domain, tactic_list, notes, datasource_of):
+    """Generate markdown for the given techniques, using worker processes if the --jobs flag was set."""
+    # Pages of techniques whose inputs did not change since the previous build are kept as they are
+    outdated_techniques = []
+    for technique in techniques:
+        if is_technique_current(technique, tactic_list):
+            sort_technique_list_properties(technique)
+        else:
+            outdated_techniques.append(technique)
+    techniques = outdated_techniques
+
+    pool = util.buildhelpers.get_process_pool() if techniques else None
+
+    if not pool:
+        for technique in techniques:
+            generate_technique_md(technique, domain, tactic_list, notes, datasource_of)
+        return
+
+    # Warm the relationship maps so the forked workers inherit them instead of building their own
+    warm_relationship_maps()
+
+    global technique_md_args
+    technique_md_args = [(technique, domain, tactic_list, notes, datasource_of) for technique in techniques]
+
+    logger.info(f"Generating {len(techniques)} technique pages with {util.buildhelpers.get_jobs()} workers")
+    with pool:
+        # Consume the results so exceptions raised in the workers are raised here
+        list(pool.map(generate_technique_md_job, range(len(technique_md_args))))
+
+    technique_md_args = []
+
+    # Workers sort the list properties of their own copy of the techniques, keep the objects of this process in sync
+    for technique in techniques:
+        sort_technique_list_properties(technique)
+
+
+def generate_technique_md_job(index):
+    """Generate the markdown for one technique in a worker process."""
+    generate_technique_md(*technique_md_args[index])
+
+
+def warm_relationship_maps():
+    """Build the relationship maps used by the technique pages."""
+    util.relationshipgetters.get_subtechniques_of()
+    util.relationshipgetters.get_technique_mitigated_by_mitigation()
+    util.relationshipgetters.get_assets_targeted_by_techniques()
+    util.relationshipgetters.get_detectionstrategies_detecting_technique()
+    util.relationshipgetters.get_tools_using_technique()
+    util.relationshipgetters.get_malware_using_technique()
+    util.relationshipgetters.get_groups_using_technique()
+    util.relationshipgetters.get_campaigns_using_technique()
+
+
+def sort_list_properties(obj):
+    """Sort the list properties that the page of a technique or sub-technique displays, in place."""
+    if not util.buildhelpers.get_attack_id(obj) or obj.get("x_mitre_deprecated") or not obj.get("description"):
+        return
+
+    for prop in technique_sorted_properties:
+        if obj.get(prop):
+            obj[prop].sort()
+
+
+def sort_technique_list_properties(technique):
+    """Sort the list properties of a technique and its sub-techniques like generate_technique_md does."""
+    if not util.buildhelpers.get_attack_id(technique):
+        return
+
+    sort_list_properties(technique)
+    for subtechnique in util.relationshipgetters.get_subtechniques_of().get(technique["id"], []):
+        sort_list_properties(subtechnique["object"])
+
+
+def get_technique_markdown_paths(technique):
+    """Return the markdown files generated for a technique and its sub-techniques."""
+    attack_id = util.buildhelpers.get_attack_id(technique)
+    paths = [os.path.join(techniques_config.techniques_markdown_path, attack_id + ".md")]
+
+    for subtechnique in util.relationshipgetters.get_subtechniques_of().get(technique["id"], []):
+        sub_attack_id = util.buildhelpers.get_attack_id(subtechnique["object"])
+        if sub_attack_id:
+            path = f"{attack_id}-{sub_attack_id.split('.')[1]}"
+            paths.append(os.path.join(techniques_config.techniques_markdown_path, path + ".md"))
+
+    return paths
+
+
+def is_technique_current(technique, tactic_list):
+    """Return if the pages of a technique and its sub-techniques are unchanged since the previous build."""
+    if not util.buildhelpers.get_attack_id(technique):
+        return False
+
+    subtechniques = util.relationshipgetters.get_subtechniques_of().get(technique["id"], [])
+    stix_ids = [technique["id"]] + [subtechnique["object"]["id"] for subtechnique in subtechniques]
+    tactic_ids = [tactic["id"] for tactic in tactic_list]
+
+    markdown_paths = get_technique_markdown_paths(technique)
+
+    return util.buildmanifest.is_page_current(
+        key=markdown_paths[0],
+        markdown_paths=markdown_paths,
+        dependencies=util.buildmanifest.get_dependencies(stix_ids, tactic_ids),
+        module=techniques_config.module_name,
+    )
+
+
+def generate_technique_md(technique, domain, tactic_list, notes, datasource_of):
     """Generetes markdown data for given technique."""
     attack_id = util.buildhelpers.get_attack_id(technique)
     # Only add technique if the attack id was found
@@ -109,7 +234,7 @@ def generate_technique_md(technique, domain, side_nav_data, tactic_list, notes,
 
         technique_dict["attack_id"] = attack_id
         technique_dict["domain"] = domain.split("-")[0]
-        technique_dict["menu"] = side_nav_data
+        technique_dict["side_nav"] = techniques_config.side_nav_key
         technique_dict["name"] = technique.get("name")
         technique_dict["notes"] = notes.get(technique["id"])
 
@@ -140,7 +265,7 @@ def generate_technique_md(technique, domain, side_nav_data, tactic_list, notes,
                 sub_tech_dict = {}
 
                 sub_tech_dict["domain"] = domain.split("-")[0]
-                sub_tech_dict["menu"] = side_nav_data
+                sub_tech_dict["side_nav"] = techniques_config.side_nav_key
                 sub_tech_dict["parent_id"] = technique_dict["attack_id"]
                 sub_tech_dict["parent_name"] = technique.get("name")
                 sub_tech_dict["subtechniques"] = technique_dict["subtechniques"]
@@ -176,6 +301,9 @@ def generate_data_for_md(technique_dict, technique, tactic_list, is_sub_techniqu
             technique_dict["sub_number"] = technique_dict["attack_id"].split(".")[1]
         technique_dict["is_subtechnique"] = True
 
+    # Sorted in place, sort_technique_list_properties does the same for the techniques of other processes
+    sort_list_properties(technique)
+
     if technique_dict["attack_id"]:
         # Get capecs and mtcs
         for ref in technique["external_references"]:
@@ -259,23 +387,19 @@ def generate_data_for_md(technique_dict, technique, tactic_list, is_sub_techniqu
 
             # Get platforms that technique uses
             if technique.get("x_mitre_platforms"):
-                technique["x_mitre_platforms"].sort()
                 technique_dict["platforms"] = ", ".join(technique["x_mitre_platforms"])
 
             # Get system requirements
             if technique.get("x_mitre_system_requirements"):
-                technique["x_mitre_system_requirements"].sort()
                 technique_dict["sysreqs"] = ", ".join(technique["x_mitre_system_requirements"])
                 technique_dict["sysreqs"] = re.sub(r"\.?\\n+", "; ", technique_dict["sysreqs"])
 
             # Get permissions required
             if technique.get("x_mitre_permissions_required"):
-                technique["x_mitre_permissions_required"].sort()
                 technique_dict["perms"] = ", ".join(technique["x_mitre_permissions_required"])
 
             # Get effective permissions
             if technique.get("x_mitre_effective_permissions"):
-                technique["x_mitre_effective_permissions"].sort()
                 technique_dict["eff_perms"] = ", ".join(technique["x_mitre_effective_permissions"])
 
             # Get if technique supports remote
@@ -294,22 +418,18 @@ def generate_data_for_md(technique_dict, technique, tactic_list, is_sub_techniqu
 
             # Get list of impacts
             if technique.get("x_mitre_impact_type"):
-                technique["x_mitre_impact_type"].sort()
                 technique_dict["impact_type"] = ", ".join(technique["x_mitre_impact_type"])
 
             # Get list of defenses bypassed
             if technique.get("x_mitre_defense_bypassed"):
-                technique["x_mitre_defense_bypassed"].sort()
                 technique_dict["def_bypass"] = ", ".join(technique["x_mitre_defense_bypassed"])
 
             # Get list of contributors
             if technique.get("x_mitre_contributors"):
-                technique["x_mitre_contributors"].sort()
                 technique_dict["contributors"] = "; ".join(technique["x_mitre_contributors"])
 
             # Get list of tactic types
             if technique.get("x_mitre_tactic_type"):
-                technique["x_mitre_tactic_type"].sort()
                 technique_dict["tactic_type"] = ", ".join(technique["x_mitre_tactic_type"])
 
             # Get detection data
@@ -636,11 +756,11 @@ def get_subtechniques(technique):
     return sorted(subtechs, key=lambda k: k["id"])
 
 
-def generate_sidebar_techniques(side_nav_data):
+def generate_sidebar_techniques():
     """Responsible for generating the sidebar for the technique pages."""
     logger.info("Generating technique sidebar")
     data = {}
-    data["menu"] = side_nav_data
+    data["side_nav"] = techniques_config.side_nav_key
 
     # Sidebar Overview
     sidebar_techniques_md = techniques_config.sidebar_techniques_md + json.dumps(data)
@@ -9,6 +9,9 @@ techniques_markdown_path = "content/pages/techniques/"
 # Path for templates
 techniques_templates_path = "modules/techniques/templates/"
 
+# Key of the side navigation shared by the pages of the module
+side_nav_key = "techniques"
+
 # String template for all techniques
 technique_md = Template(
     "Title: ${name}-${domain}\nTemplate: techniques/technique\nsave_as: techniques/${attack_id}/index.html\ndata: "
@@ -1,4 +1,9 @@
-from . import tests, tests_config
+from modules import util
+
+from . import citationchecker, linkchecker, tests, tests_config
+
+util.htmlscanner.register_visitor(tests_config.module_name, tests_config.priority, linkchecker.collect_page)
+util.htmlscanner.register_visitor(tests_config.module_name, tests_config.priority, citationchecker.check_page)
 
 
 def get_priority():
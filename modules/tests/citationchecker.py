@@ -3,43 +3,48 @@ import re
 
 from loguru import logger
 
-from modules import site_config
+from modules import site_config, util
 
 from . import tests_config
 
-potential_issues_list = [r"\(Citation: ?[^)]+\)?"]
+potential_issues_list = [re.compile(r"\(Citation: ?[^)]+\)?")]
+
+
+# Pages collected while the output is scanned
+broken_pages = []
+okay_files = 0
+
+
+def check_page(filepath, html_str):
+    """Check an output page for broken citations: (Citation: *)"""
+    global okay_files
+
+    # skip previous instances of the code to speed this up
+    directory = os.path.dirname(filepath)
+    if "previous" in directory or "versions" in directory:
+        return
+    if os.path.basename(filepath) == "changelog-detailed.html":
+        return
+
+    problems = []
+    for issue in potential_issues_list:
+        check = issue.findall(html_str)
+        for entry in check:
+            if not entry in problems:
+                problems.append(entry)
+
+    if not problems:
+        okay_files += 1
+    else:
+        if site_config.web_directory in filepath:
+            filepath = filepath.split(site_config.web_directory)[1]
+        broken_pages.append({"path": filepath, "problems": problems})
 
 
 def citations_check():
     """Check for broken citations: (Citation: *) in HTML pages"""
-    # Hold broken pages information
-    broken_pages = []
-    okay_files = 0
-
-    for directory, _, files in os.walk(site_config.web_directory):
-        # skip previous instances of the code to speed this up
-        if "previous" in directory or "versions" in directory:
-            continue
-        for filename in files:
-            problems = []
-            if filename == "changelog-detailed.html":
-                continue
-            if filename.endswith(".html"):
-                filepath = os.path.join(directory, filename)
-                with open(filepath, "r", encoding="utf8") as f_handle:
-                    data = f_handle.read()
-                    for issue in potential_issues_list:
-                        p = re.compile(issue)
-                        check = p.findall(data)
-                        for entry in check:
-                            if not entry in problems:
-                                problems.append(entry)
-            if not problems:
-                okay_files += 1
-            else:
-                if site_config.web_directory in filepath:
-                    filepath = filepath.split(site_config.web_directory)[1]
-                broken_pages.append({"path": filepath, "problems": problems})
+    # Pages are checked by check_page while the output is scanned
+    util.htmlscanner.scan_output()
 
     exit_code = write_report(
         report_file=os.path.join(site_config.test_report_directory, tests_config.citations_report_filename),
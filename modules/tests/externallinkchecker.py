@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from loguru import logger
+
+from modules import site_config
+
+from . import tests_config
+
+# HEAD responses with these status codes are checked again with GET, some servers don't implement HEAD
+HEAD_FALLBACK_STATUSES = [403, 404, 405, 429, 501]
+
+
+def get_cache_path():
+    """Return the path of the external links cache."""
+    return os.path.join(site_config.cache_directory, tests_config.external_links_cache_filename)
+
+
+def load_cache(cache_path):
+    """Return the cached results of previous checks: url => timestamp of the last successful check."""
+    if not cache_path or not os.path.isfile(cache_path):
+        return {}
+
+    try:
+        with open(cache_path, "r", encoding="utf8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.warning(f"Ignoring unreadable external links cache: {cache_path}")
+        return {}
+
+
+def save_cache(cache_path, cache):
+    """Write the results of the external link checks to the cache."""
+    if not cache_path:
+        return
+
+    cache_dir = os.path.dirname(cache_path)
+    if cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+
+    with open(cache_path, "w", encoding="utf8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def get_host(url):
+    """Return the scheme and host of a url, requests to the same host share a connection pool and rate limit."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def new_session(headers, proxy):
+    """Return a session that keeps connections alive for the requests of one worker thread to one host."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=tests_config.external_links_per_host)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    if headers:
+        session.headers.update(headers)
+    if proxy:
+        session.proxies.update({"http": proxy, "https": proxy})
+
+    return session
+
+
+def get_session(host):
+    """Return the session of the current worker thread for a host, requests.Session is not shared between threads."""
+    session = getattr(host["thread_sessions"], "session", None)
+    if session is None:
+        session = new_session(host["headers"], host["proxy"])
+        host["thread_sessions"].session = session
+        host["sessions"].append(session)
+
+    return session
+
+
+def request_status(host, url):
+    """Return the status code of a url, with HEAD first and GET if the server doesn't answer HEAD properly.
+
+    Redirects are not followed, moved links are reported with their 301/302 status so that they can be updated.
+    """
+    session = get_session(host)
+    timeout = tests_config.external_links_timeout
+
+    response = session.head(url, timeout=timeout, allow_redirects=False)
+    response.close()
+
+    if response.status_code in HEAD_FALLBACK_STATUSES:
+        # Only the status is needed, don't download the body
+        response = session.get(url, timeout=timeout, allow_redirects=False, stream=True)
+        response.close()
+
+    return response.status_code
+
+
+async def check_url(url, host, semaphore):
+    """Return None if the url is reachable, or the problem found."""
+    loop = asyncio.get_running_loop()
+
+    async with semaphore, host["semaphore"]:
+        # Space out the requests to the same host
+        async with host["lock"]:
+            wait = host["next_request"] - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            host["next_request"] = loop.time() + tests_config.external_links_host_interval
+
+        try:
+            status_code = await asyncio.to_thread(request_status, host, url)
+        except Exception as ex:
+            return f"external link {type(ex).__name__}"
+
+    return None if status_code == 200 else status_code
+
+
+async def check_urls_async(urls, headers, proxy):
+    """Check the given urls concurrently, return url => problem (None if the url is reachable)."""
+    semaphore = asyncio.Semaphore(tests_config.external_links_max_concurrency)
+
+    hosts = {}
+    for url in urls:
+        host = get_host(url)
+        if host not in hosts:
+            hosts[host] = {
+                "headers": headers,
+                "proxy": proxy,
+                # Sessions of the worker threads that requested this host
+                "thread_sessions": threading.local(),
+                "sessions": [],
+                "semaphore": asyncio.Semaphore(tests_config.external_links_per_host),
+                "lock": asyncio.Lock(),
+                "next_request": 0,
+            }
+
+    try:
+        problems = await asyncio.gather(*[check_url(url, hosts[get_host(url)], semaphore) for url in urls])
+    finally:
+        for host in hosts.values():
+            for session in host["sessions"]:
+                session.close()
+
+    return dict(zip(urls, problems))
+
+
+def check_urls(urls, headers=None, proxy=None, cache_path=None, ttl=None):
+    """Check a list of external urls, return url => problem (None if the url is reachable).
+
+    Each url is only requested once. Urls that were reachable less than ttl seconds ago according to the
+    cache at cache_path are not requested again; pass cache_path=None to check every url.
+    """
+    if ttl is None:
+        ttl = tests_config.external_links_cache_ttl
+
+    now = time.time()
+    cache = load_cache(cache_path)
+    # Drop expired entries so the cache doesn't grow with links that were removed from the site
+    cache = {url: checked for url, checked in cache.items() if now - checked < ttl}
+
+    urls = sorted(set(urls))
+    results = {url: None for url in urls if url in cache}
+    stale_urls = [url for url in urls if url not in cache]
+
+    logger.info(f"Checking {len(stale_urls)} external links ({len(results)} cached)")
+
+    if stale_urls:
+        results.update(asyncio.run(check_urls_async(stale_urls, headers, proxy)))
+
+    for url in stale_urls:
+        if results[url] is None:
+            cache[url] = now
+
+    save_cache(cache_path, cache)
+
+    return results
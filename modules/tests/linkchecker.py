@@ -1,15 +1,15 @@
+import json
 import os
 import re
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
 from loguru import logger
 
 import modules
-from modules import site_config
+from modules import redirections, site_config, util
 
-from . import tests_config
+from . import externallinkchecker, tests_config
 
 # STATIC PROPERTIES
 
@@ -36,6 +36,11 @@ relative_link_cache = {}
 links_list = {}
 in_use_links = {}
 
+# Pages collected while the output is scanned: {"filepath", "links", "check_external_links"}
+scanned_pages = []
+# Pages with a noindex meta tag, e.g. deprecated objects
+noindex_pages = set()
+
 internal_problem = False
 
 # Google Chrome headers
@@ -171,7 +176,61 @@ def check_if_relative_link(link):
     return result
 
 
-def internal_external_link_checker(filepath, html_str):
+def is_external_link_check():
+    """Return if external links are checked in this build."""
+    if site_config.args.tests:
+        return "external_links" in site_config.args.tests
+    return False
+
+
+def extract_links(filepath, html_str, check_external_links=False):
+    """Return the href and src links of an html page as a string."""
+    links = []
+
+    for prefix in ["href", "src"]:
+        if check_external_links:
+            # Regular expression includes http: and https:
+            if (
+                "/versions/" in filepath
+            ):  # don't check links with data-test-ignore attribute, or live version link name, when on previous versions
+                linkregex = rf'{prefix}\s?=\s?["\']([{ALLOWED_IN_LINK_EXTERNAL}]+)["\'](?! ?data-test-ignore="true")(?!>live version)'
+            else:
+                linkregex = rf"{prefix}\s?=\s?[\"']([{ALLOWED_IN_LINK_EXTERNAL}]+)[\"']"
+        else:
+            linkregex = rf"{prefix}\s?=\s?[\"']([{ALLOWED_IN_LINK_INTERNAL}]+)[\"']"
+        links.extend(re.findall(linkregex, html_str))
+
+    return links
+
+
+def collect_page(filepath, html_str):
+    """Collect the links of an output page, they are checked once every page was scanned."""
+    check_external_links = is_external_link_check() and "previous" not in filepath and "versions" not in filepath
+
+    if "previous" not in filepath and "versions" not in filepath:
+        # Add redirects to in-use to avoid false positives
+        if html_str.startswith('<meta http-equiv="refresh"'):
+            corrected_path = remove_extra_from_path(filepath)
+
+            if corrected_path.startswith("\\"):
+                corrected_path = corrected_path.replace("\\", "/")
+
+            if not in_use_links.get(corrected_path):
+                in_use_links[corrected_path] = True
+
+    if '<meta name="robots" content="noindex, nofollow">' in html_str:
+        noindex_pages.add(filepath)
+
+    scanned_pages.append(
+        {
+            "filepath": filepath,
+            "links": extract_links(filepath, html_str, check_external_links),
+            "check_external_links": check_external_links,
+        }
+    )
+
+
+def internal_external_link_checker(filepath, links):
     """Check internal and external links."""
     # Flag to determine if internal link is broken
     internal_link_error = False
@@ -180,108 +239,81 @@ def internal_external_link_checker(filepath, html_str):
     problems = []
     relative_links = []
 
-    # find all links
-    for prefix in ["href", "src"]:
-        # Regular expression includes http: and https:
-        if (
-            "/versions/" in filepath
-        ):  # don't check links with data-test-ignore attribute, or live version link name, when on previous versions
-            linkregex = rf'{prefix}\s?=\s?["\']([{ALLOWED_IN_LINK_EXTERNAL}]+)["\'](?! ?data-test-ignore="true")(?!>live version)'
+    # check if link has a dest
+    for link in links:
+        # Check if link is relative path
+        is_relative = check_if_relative_link(link)
+
+        # Add to relative links list if relative
+        if is_relative:
+            if link not in relative_links:
+                relative_links.append(link)
+
+        # Get correct path
+        link = get_correct_link(link)
+        # Check if link is in use
+        check_if_link_in_use(filepath, link)
+
+        if link in links_list:
+            # If problem detected, add to problem list
+            if links_list[link]:
+                if link not in problems:
+                    problems.append(f"[{links_list[link]}] {link}")
         else:
-            linkregex = rf"{prefix}\s?=\s?[\"']([{ALLOWED_IN_LINK_EXTERNAL}]+)[\"']"
-        links = re.findall(linkregex, html_str)
-
-        # check if link has a dest
-        for link in links:
-            # Check if link is relative path
-            is_relative = check_if_relative_link(link)
-
-            # Add to relative links list if relative
-            if is_relative:
-                if link not in relative_links:
-                    relative_links.append(link)
-
-            # Get correct path
-            link = get_correct_link(link)
-            # Check if link is in use
-            check_if_link_in_use(filepath, link)
-
-            if link in links_list:
-                # If problem detected, add to problem list
-                if links_list[link]:
-                    if link not in problems:
-                        problems.append(f"[{links_list[link]}] {link}")
-            elif link.startswith("http"):
-                # Consider status 404 and unreachable as broken.
-                # Unreachable will be triggered by the except clause
-                try:
-                    r = requests.head(link, headers=headers, timeout=5)
-                    if r.status_code != 200:
-                        links_list[link] = r.status_code
-                        problems.append(f"[{r.status_code}] {link}")
-                    else:
-                        links_list[link] = None
-                except Exception as ex:
-                    links_list[link] = f"external link {type(ex).__name__}"
-                    problems.append(f"[external link {type(ex).__name__}] {link}")
-            else:
-                if internal_link_test(link):
-                    problems.append(f"[internal page missing] {link}")
-                    links_list[link] = "internal page missing"
+            if internal_link_test(link):
+                problems.append(f"[internal page missing] {link}")
+                links_list[link] = "internal page missing"
 
-                    if not internal_link_error:
-                        internal_link_error = True
-                else:
-                    links_list[link] = None
+                if not internal_link_error:
+                    internal_link_error = True
+            else:
+                links_list[link] = None
 
     return problems, relative_links, internal_link_error
 
 
-def internal_link_checker(filepath, html_str):
-    """Given an html page as a string, check if there are broken internal links."""
+def internal_link_checker(filepath, links):
+    """Given the links of an html page, check if there are broken internal links."""
     # Flag to determine if internal link is broken
     internal_link_error = False
 
     problems = []
     relative_links = []
 
-    # find all links
-    for prefix in ["href", "src"]:
-        links = re.findall(rf"{prefix}\s?=\s?[\"']([{ALLOWED_IN_LINK_INTERNAL}]+)[\"']", html_str)
-        # check if link has a dest
-        for link in links:
-            # Check if link is relative path
-            is_relative = check_if_relative_link(link)
-
-            # Add to relative links list if relative
-            if is_relative:
-                if link not in relative_links:
-                    relative_links.append(link)
-
-            # Get correct path
-            link = get_correct_link(link)
-
-            for ignored_link in IGNORED_LINKS:
-                if ignored_link in link:
-                    logger.debug(f"Ignoring link: {link}")
-                    links_list[link] = None
-
-            # Check if link is in use
-            check_if_link_in_use(filepath, link)
-
-            if link in links_list:
-                if links_list[link]:
-                    if link not in problems:
-                        problems.append(f"[{links_list[link]}] {link}")
-            else:
-                if internal_link_test(link):
-                    problems.append(f"[internal page missing] {link}")
-                    links_list[link] = "internal page missing"
+    # check if link has a dest
+    for link in links:
+        # Check if link is relative path
+        is_relative = check_if_relative_link(link)
+
+        # Add to relative links list if relative
+        if is_relative:
+            if link not in relative_links:
+                relative_links.append(link)
+
+        # Get correct path
+        link = get_correct_link(link)
+
+        for ignored_link in IGNORED_LINKS:
+            if ignored_link in link:
+                logger.debug(f"Ignoring link: {link}")
+                links_list[link] = None
 
-                    if not internal_link_error:
-                        internal_link_error = True
-                else:
-                    links_list[link] = None
+        # Check if link is in use
+        check_if_link_in_use(filepath, link)
+
+        if link in links_list:
+            if links_list[link]:
+                if link not in problems:
+                    problems.append(f"[{links_list[link]}] {link}")
+        else:
+            if internal_link_test(link):
+                problems.append(f"[internal page missing] {link}")
+                links_list[link] = "internal page missing"
+
+                if not internal_link_error:
+                    internal_link_error = True
+            else:
+                links_list[link] = None
 
     return problems, relative_links, internal_link_error
 
@@ -291,12 +323,7 @@ def check_if_file_is_deprecated(filename):
 
     Return True if it is deprecated, False if not.
     """
-    with open(filename, "r", encoding="utf8") as f:
-        lines = f.readlines()
-        for line in lines:
-            if '<meta name="robots" content="noindex, nofollow">' in line:
-                return True
-    return False
+    return filename in noindex_pages
 
 
 def check_unlinked_pages(filenames):
@@ -345,31 +372,12 @@ def check_unlinked_pages(filenames):
     return unlinked_pages
 
 
-def check_links_on_page(filepath, check_external_links=False):
-    """Return whether the links on the given file are all valid."""
-    # Declare just in case there is a problem opening the file
-    problems = []
-    relative_links = []
-    internal_problem = False
-
-    with open(filepath, mode="r", encoding="utf8") as html:
-        html_str = html.read()
-
-        if "previous" not in filepath and "versions" not in filepath:
-            # Add redirects to in-use to avoid false positives
-            if html_str.startswith('<meta http-equiv="refresh"'):
-                corrected_path = remove_extra_from_path(filepath)
-
-                if corrected_path.startswith("\\"):
-                    corrected_path = corrected_path.replace("\\", "/")
-
-                if not in_use_links.get(corrected_path):
-                    in_use_links[corrected_path] = True
-
-        if check_external_links:
-            problems, relative_links, internal_problem = internal_external_link_checker(filepath, html_str)
-        else:
-            problems, relative_links, internal_problem = internal_link_checker(filepath, html_str)
+def check_links_on_page(filepath, links, check_external_links=False):
+    """Return whether the links of the given file are all valid."""
+    if check_external_links:
+        problems, relative_links, internal_problem = internal_external_link_checker(filepath, links)
+    else:
+        problems, relative_links, internal_problem = internal_link_checker(filepath, links)
 
     filepath = remove_extra_from_path(filepath)
     return {
@@ -384,27 +392,52 @@ def check_links(external_links=False):
     """Check all links on the site to make sure that they have a valid destination."""
     broken_pages = []
     relative_links = []
-    filenames = []
     internal_problem = False
 
-    html_filepaths = []
-    for directory, _, files in os.walk(site_config.web_directory):
-        for filename in filter(lambda f: f.endswith(".html"), files):
-            filepath = os.path.join(directory, filename)
-            filenames.append(filepath)
-            html_filepaths.append(filepath)
+    # Links are collected by collect_page while the output is scanned
+    util.htmlscanner.scan_output()
+    filenames = [page["filepath"] for page in scanned_pages]
+
+    if external_links:
+        # External links are checked once for the whole site, before the pages are checked
+        external_urls = [
+            get_correct_link(link)
+            for page in scanned_pages
+            if page["check_external_links"]
+            for link in page["links"]
+            if link.startswith("http")
+        ]
+        links_list.update(
+            externallinkchecker.check_urls(
+                external_urls,
+                headers=headers,
+                proxy=site_config.args.proxy,
+                cache_path=externallinkchecker.get_cache_path(),
+            )
+        )
+
+    # Old links are redirected by the web server when the redirects were written as an nginx map
+    redirects_json = os.path.join(
+        site_config.web_directory,
+        redirections.redirections_config.nginx_redirects_directory,
+        redirections.redirections_config.nginx_redirects_json,
+    )
+    if os.path.isfile(redirects_json):
+        with open(redirects_json, "r", encoding="utf8") as f:
+            for from_path in json.load(f):
+                links_list[get_correct_link(from_path)] = None
 
     # Parallelize link checking
     max_workers = min(32, os.cpu_count() or 4)
     lock = threading.Lock()
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_filepath = {}
-        for filepath in html_filepaths:
-            if external_links and "previous" not in filepath and "versions" not in filepath:
-                future = executor.submit(check_links_on_page, filepath, True)
+        for page in scanned_pages:
+            if external_links and page["check_external_links"]:
+                future = executor.submit(check_links_on_page, page["filepath"], page["links"], True)
             else:
-                future = executor.submit(check_links_on_page, filepath)
-            future_to_filepath[future] = filepath
+                future = executor.submit(check_links_on_page, page["filepath"], page["links"])
+            future_to_filepath[future] = page["filepath"]
 
         for future in as_completed(future_to_filepath):
             report = future.result()
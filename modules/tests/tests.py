@@ -6,7 +6,7 @@ import bleach
 import markdown
 from loguru import logger
 
-from modules import site_config
+from modules import site_config, util
 
 # stixtests is optional - may be disabled
 try:
@@ -42,7 +42,9 @@ def run_tests():
     ###################
     if (site_config.args.tests and "size" in site_config.args.tests) or not site_config.args.tests:
         tests += 1
-        if check_size() == tests_config.SIZE_ERROR:
+        with util.profiler.stage("Size test"):
+            size_exit_code = check_size()
+        if size_exit_code == tests_config.SIZE_ERROR:
             error_list.append(tests_config.SIZE_ERROR)
 
     ######################
@@ -54,11 +56,9 @@ def run_tests():
         tests += 3
         # Check external and internal links if external link flag was set.
         # Only check internal links if not set
-        if site_config.args.tests:
-            do_external = "external_links" in site_config.args.tests
-        else:
-            do_external = False
-        exit_codes, broken_links_count, unlinked_pages, relative_links = check_links(do_external)
+        do_external = linkchecker.is_external_link_check()
+        with util.profiler.stage("Links test"):
+            exit_codes, broken_links_count, unlinked_pages, relative_links = check_links(do_external)
 
         for exit_code in exit_codes:
             if exit_code != tests_config.SUCCESS:
@@ -69,7 +69,8 @@ def run_tests():
     #################
     if (site_config.args.tests and "citations" in site_config.args.tests) or not site_config.args.tests:
         tests += 1
-        exit_code, broken_citations_count = check_citations()
+        with util.profiler.stage("Citations test"):
+            exit_code, broken_citations_count = check_citations()
         if exit_code == tests_config.BROKEN_CITATION:
             error_list.append(tests_config.BROKEN_CITATION)
 
@@ -226,6 +227,9 @@ def create_combined_reports_html():
     stixtests_html = stixtests.stixtests_config.combined_reports_filename if stixtests else None
     report_sections = []
     for report in reports:
+        if not os.path.isfile(os.path.join(site_config.test_report_directory, report)):
+            # e.g. the profile directory
+            continue
         if stixtests_html and report == stixtests_html:
             # not combining with the stixtests_html file because its components already exist
             continue
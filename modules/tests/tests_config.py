@@ -1,3 +1,5 @@
+import os
+
 import colorama
 
 from modules import util
@@ -14,6 +16,16 @@ linkbyids_report_filename = "linkbyids-report.md"
 
 combined_reports_filename = "tests.html"
 
+# External link checker
+# Reachable links are cached in the build cache directory and only checked again after the TTL (seconds)
+external_links_cache_filename = "external-links.json"
+external_links_cache_ttl = int(os.getenv("EXTERNAL_LINKS_CACHE_TTL", 7 * 24 * 60 * 60))
+# Concurrent requests, in total and per host, and minimum seconds between the requests to the same host
+external_links_max_concurrency = 32
+external_links_per_host = int(os.getenv("EXTERNAL_LINKS_PER_HOST", 4))
+external_links_host_interval = float(os.getenv("EXTERNAL_LINKS_HOST_INTERVAL", 0.25))
+external_links_timeout = 5
+
 # Exit codes:
 SUCCESS = 0
 FAILURE = 1
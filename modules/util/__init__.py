@@ -1,8 +1,23 @@
-from . import buildhelpers, relationshipgetters, relationshiphelpers, stixhelpers
+from . import (
+    buildhelpers,
+    buildmanifest,
+    htmlscanner,
+    mapcache,
+    profiler,
+    relationshipgetters,
+    relationshiphelpers,
+    stixhelpers,
+    stixstore,
+)
 
 __all__ = [
     "relationshipgetters",
     "relationshiphelpers",
     "buildhelpers",
+    "buildmanifest",
+    "htmlscanner",
+    "mapcache",
+    "profiler",
     "stixhelpers",
+    "stixstore",
 ]
@@ -1,8 +1,11 @@
+import bisect
 import datetime
 import json
+import multiprocessing
 import os
 import re
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 
 import bleach
@@ -13,6 +16,12 @@ from modules import site_config
 
 from . import relationshipgetters, util_config
 
+# (STIX ID, modified) => (source name, description, url) of the references an object adds to the reference lists
+object_references = {}
+
+# Citation markers inside of STIX descriptions, e.g. "(Citation: Name)"
+citation_regex = re.compile(r"\(Citation: (.*?)\)")
+
 
 def timestamp():
     """Return a timestamp."""
@@ -121,38 +130,54 @@ def get_domain_display_name(domain):
     return domain_name_map.get(domain, domain)
 
 
-def update_reference_list(reference_list, obj):
-    """Given a reference list and an object, update the reference list with the external references found in the object."""
-    if obj.get("external_references"):
-        # Add external reference to reference list if not found
-        for ext_ref in obj["external_references"]:
-            # Only add if reference has source name and a description
-            if ext_ref.get("source_name") and ext_ref.get("description"):
-                # Do not add to reference list if citation is in description
-                if "(Citation:" in ext_ref["description"]:
-                    continue
+def get_object_references(obj):
+    """Given an object, return (source name, description, url) of the external references listed as its references.
+
+    The references of a STIX object are extracted once, the object and its relationships are usually added to the
+    reference lists of several pages.
+    """
+    key = (obj.get("id"), obj.get("modified"))
+    if key[0] and key in object_references:
+        return object_references[key]
 
-                in_list = find_in_reference_list(reference_list, ext_ref["source_name"])
+    references = []
+    for ext_ref in obj.get("external_references") or []:
+        # Only add if reference has source name and a description
+        if ext_ref.get("source_name") and ext_ref.get("description"):
+            # Do not add to reference list if citation is in description
+            if "(Citation:" in ext_ref["description"]:
+                continue
 
-                if not in_list:
-                    new_ref = {}
+            references.append((ext_ref["source_name"], ext_ref["description"], ext_ref.get("url")))
 
-                    new_ref["description"] = ext_ref["description"]
-                    if ext_ref.get("url"):
-                        new_ref["url"] = ext_ref["url"]
-                    new_ref["number"] = None
+    if key[0]:
+        object_references[key] = references
 
-                    reference_list[ext_ref["source_name"]] = new_ref
+    return references
+
+
+def update_reference_list(reference_list, obj):
+    """Given a reference list and an object, update the reference list with the external references found in the object."""
+    # Add external reference to reference list if not found
+    for source_name, description, url in get_object_references(obj):
+        if not find_in_reference_list(reference_list, source_name):
+            new_ref = {}
+
+            new_ref["description"] = description
+            if url:
+                new_ref["url"] = url
+            new_ref["number"] = None
+
+            reference_list[source_name] = new_ref
 
     return reference_list
 
 
 def get_reference_set(reflist):
     """Retrieve the unique set of references in the given list of descriptions and return them in string format to be displayed as citations."""
-    p = re.compile(r"\(Citation: (.*?)\)")
     citations = {}
     for c in reflist:
-        citations_in_ref = p.findall(c)
+        citations_in_ref = citation_regex.findall(c)
         for citation in citations_in_ref:
             if citation not in citations:
                 citations[citation] = True
@@ -381,7 +406,11 @@ def get_technique_name(tid):
 
 
 def technique_used_helper(technique_list, technique, reference_list, inherited=False):
-    """Add technique to technique list and make distinction between techniques subtechniques."""
+    """Add technique to technique list and make distinction between techniques subtechniques.
+
+    Sub-techniques are inserted at their place in the list sorted by ID, instead of sorting the list again after
+    every insertion.
+    """
     attack_id = get_attack_id(technique["object"])
 
     if attack_id:
@@ -401,29 +430,27 @@ def technique_used_helper(technique_list, technique, reference_list, inherited=F
                 if parent_id not in technique_list:
                     technique_list[parent_id] = parent_technique_used_helper(parent_id)
 
-                # Check if sub-technique is already in list
-                for subtechnique in technique_list[parent_id]["subtechniques"]:
+                subtechniques = technique_list[parent_id]["subtechniques"]
+
+                # First sub-technique with this ID, if it is already in list
+                index = bisect.bisect_left(subtechniques, technique_data["id"], key=lambda k: k["id"])
+                if inherited and index < len(subtechniques) and subtechniques[index]["id"] == technique_data["id"]:
                     # Concatenate the inherited object's description to the existing ID
-                    if subtechnique["id"] == technique_data["id"] and inherited:
-                        subtechnique["color"] = 3  # belongs both to object and inherited from another
-                        if "descr" in technique_data and "descr" in subtechnique:
-                            # add markdown newline between descriptions
-                            subtechnique["descr"] += "\n\n" + technique_data["descr"]
-                        elif "descr" in technique_data:
-                            subtechnique["descr"] = technique_data["descr"]
-                        break
+                    subtechnique = subtechniques[index]
+                    subtechnique["color"] = 3  # belongs both to object and inherited from another
+                    if "descr" in technique_data and "descr" in subtechnique:
+                        # add markdown newline between descriptions
+                        subtechnique["descr"] += "\n\n" + technique_data["descr"]
+                    elif "descr" in technique_data:
+                        subtechnique["descr"] = technique_data["descr"]
                 else:  # sub-technique is not in list
                     # Add subtechnique to list
                     if inherited:
                         technique_data["color"] = 2  # inherited from another object only
                     else:
                         technique_data["color"] = 1  # belongs to object only (not inherited)
-                    technique_list[parent_id]["subtechniques"].append(technique_data)
-
-                # Sort subtechniques by name
-                technique_list[parent_id]["subtechniques"] = sorted(
-                    technique_list[parent_id]["subtechniques"], key=lambda k: k["id"]
-                )
+                    # Keep subtechniques sorted by ID, after the ones with the same ID
+                    bisect.insort_right(subtechniques, technique_data, key=lambda k: k["id"])
 
             # Attack id is regular technique
             else:
@@ -522,19 +549,29 @@ colorMap = {
 domain_name_map = {"enterprise-attack": "Enterprise", "mobile-attack": "Mobile", "ics-attack": "ICS"}
 
 
-def get_navigator_layers(name, attack_id, obj_type, rel_type, version, techniques_used, inheritance=False):
-    """Generate the Enterprise, Mobile, and ICS Navigator JSON layers for the given object."""
-    # Generate Enterprise base layer
-    enterprise_layer = build_base_layer("enterprise-attack", name, obj_type, rel_type, attack_id, version, inheritance)
+# (domain, object type, relationship type) => parts of the Navigator layer shared by the objects of that type
+layer_templates = {}
 
-    # Generate Mobile base layer
-    mobile_layer = build_base_layer("mobile-attack", name, obj_type, rel_type, attack_id, version, inheritance)
 
-    # Generate ICS base layer
-    ics_layer = build_base_layer("ics-attack", name, obj_type, rel_type, attack_id, version, inheritance)
+def get_layer_domains():
+    """Return (domain, short name) of the domains of the site that Navigator layers are generated for."""
+    return [
+        (domain["name"], domain["name"].split("-")[0]) for domain in site_config.domains if not domain["deprecated"]
+    ]
+
+
+def get_navigator_layers(name, attack_id, obj_type, rel_type, version, techniques_used, inheritance=False):
+    """Generate the Navigator layers of the given object for the domains of the site that it uses techniques of."""
+    domain_layers = {}
+    for domain, short_name in get_layer_domains():
+        domain_layers[short_name] = build_base_layer(domain, name, obj_type, rel_type, attack_id, version, inheritance)
 
     # Add technique data to layer
     for technique in techniques_used:
+        domain_layer = domain_layers.get(technique["domain"])
+        if not domain_layer:
+            continue
+
         # Generate the navigator technique layer object
         description = technique["descr"] if technique.get("descr") else None
         color = technique["color"] if technique.get("color") else 0
@@ -548,13 +585,7 @@ def get_navigator_layers(name, attack_id, obj_type, rel_type, version, technique
         if not technique_layer_object:
             continue
 
-        # Add technique layer object to domain layer
-        if "enterprise" in technique["domain"]:
-            enterprise_layer["techniques"].append(technique_layer_object)
-        if "mobile" in technique["domain"]:
-            mobile_layer["techniques"].append(technique_layer_object)
-        if "ics" in technique["domain"]:
-            ics_layer["techniques"].append(technique_layer_object)
+        domain_layer["techniques"].append(technique_layer_object)
 
         # Add subtechnique data to layer
         if has_subtechniques:
@@ -564,80 +595,89 @@ def get_navigator_layers(name, attack_id, obj_type, rel_type, version, technique
                 sub_id = f"{technique['id']}.{subtechnique['id']}"
                 sub_descr = subtechnique["descr"] if subtechnique.get("descr") else None
                 sub_color = subtechnique["color"] if subtechnique.get("color") else 0
-                subtechnique_layer_object = get_technique_layer_object(sub_id, sub_descr, score, sub_color, True)
-
-                # Add (sub)technique layer object to domain layer
-                if "enterprise" in technique["domain"]:
-                    enterprise_layer["techniques"].append(subtechnique_layer_object)
-                if "mobile" in technique["domain"]:
-                    mobile_layer["techniques"].append(subtechnique_layer_object)
-                if "ics" in technique["domain"]:
-                    ics_layer["techniques"].append(subtechnique_layer_object)
+                domain_layer["techniques"].append(get_technique_layer_object(sub_id, sub_descr, score, sub_color, True))
 
     # Build list of domains with navigator layers
     layers = []
-    if enterprise_layer["techniques"]:
-        layers.append(
-            {
-                "domain": "enterprise",
-                "name": domain_name_map["enterprise-attack"],
-                "filename": f"{attack_id}-enterprise-layer.json",
-                "layer": json.dumps(enterprise_layer),
-            }
-        )
-    if mobile_layer["techniques"]:
-        layers.append(
-            {
-                "domain": "mobile",
-                "name": domain_name_map["mobile-attack"],
-                "filename": f"{attack_id}-mobile-layer.json",
-                "layer": json.dumps(mobile_layer),
-            }
-        )
-    if ics_layer["techniques"]:
-        layers.append(
-            {
-                "domain": "ics",
-                "name": domain_name_map["ics-attack"],
-                "filename": f"{attack_id}-ics-layer.json",
-                "layer": json.dumps(ics_layer),
-            }
-        )
+    for domain, short_name in get_layer_domains():
+        if domain_layers[short_name]["techniques"]:
+            layers.append(
+                {
+                    "domain": short_name,
+                    "name": domain_name_map.get(domain, short_name.upper()),
+                    "filename": f"{attack_id}-{short_name}-layer.json",
+                    "layer": domain_layers[short_name],
+                }
+            )
 
     return layers
 
 
+def write_navigator_layers(path, layers):
+    """Write the layers of an object to JSON files in its output directory, e.g. output/software/S1001.
+
+    Returns the layers without their content, for the layer links of the page.
+    """
+    layers_directory = os.path.join(site_config.web_directory, path)
+    if not os.path.isdir(layers_directory):
+        os.makedirs(layers_directory)
+
+    layer_links = []
+    for layer in layers:
+        with open(os.path.join(layers_directory, layer["filename"]), "w", encoding="utf8") as f:
+            json.dump(layer["layer"], f)
+
+        layer_links.append({key: value for key, value in layer.items() if key != "layer"})
+
+    return layer_links
+
+
+def get_layer_template(domain, object_type, rel_type):
+    """Return the parts of the Navigator layer that are the same for every object of a type in a domain."""
+    key = (domain, object_type, rel_type)
+
+    if key not in layer_templates:
+        # Layer versions (layer/attack/navigator)
+        major_attack_version = site_config.attack_version.split(".")[0]
+        layer_templates[key] = {
+            "domain": domain,
+            "versions": {
+                "layer": site_config.layer_version,
+                "attack": major_attack_version,
+                "navigator": site_config.navigator_version,
+            },
+            # Layer gradient (white for un-used, blue for used)
+            "gradient": {
+                "colors": [colorMap[0], colorMap[1]],
+                "minValue": 0,
+                "maxValue": 1,
+            },
+        }
+
+    return layer_templates[key]
+
+
 def build_base_layer(domain, object_name, object_type, rel_type, attack_id, version, inheritance=False):
     """Build the base Navigator layer for the given object."""
     layer = {}
+    template = get_layer_template(domain, object_type, rel_type)
+    display_name = domain_name_map.get(domain, domain.split("-")[0].upper())
 
     # Layer description
-    layer["description"] = (
-        f"{domain_name_map[domain]} techniques {rel_type} {object_name}, ATT&CK {object_type} {attack_id}"
-    )
+    layer["description"] = f"{display_name} techniques {rel_type} {object_name}, ATT&CK {object_type} {attack_id}"
     if version:
         # Add object version number if it exists
         layer["description"] += f" (v{version})"
 
     # Layer name and domain
     layer["name"] = f"{object_name} ({attack_id})"
-    layer["domain"] = domain
-
-    # Layer versions (layer/attack/navigator)
-    major_attack_version = site_config.attack_version.split(".")[0]
-    layer_version = site_config.layer_version
-    navigator_version = site_config.navigator_version
-    layer["versions"] = {"layer": layer_version, "attack": major_attack_version, "navigator": navigator_version}
+    layer["domain"] = template["domain"]
+    layer["versions"] = template["versions"]
 
     # Layer techniques list
     layer["techniques"] = []
 
-    # Layer gradient (white for un-used, blue for used)
-    layer["gradient"] = {
-        "colors": [colorMap[0], colorMap[1]],
-        "minValue": 0,
-        "maxValue": 1,
-    }
+    layer["gradient"] = template["gradient"]
 
     # Layer legend
     layer["legendItems"] = [{"label": f"{rel_type} {object_name}", "color": colorMap[1]}]
@@ -851,22 +891,13 @@ def get_tactics_data(tactics):
     return tactics_data
 
 
-def generate_redirections(redirections_filename, redirect_md=None):
-    """Given redirections filename, open and create markdown file for redirections."""
-    with open(redirections_filename, "r", encoding="utf8") as json_redirections:
-        redirects = json.load(json_redirections)
-
-    if redirects:
-        # Verify if redirection directory exists
-        if not os.path.isdir(site_config.redirects_markdown_path):
-            os.mkdir(site_config.redirects_markdown_path)
-
-        for obj in redirects:
-            subs = redirect_md.substitute(obj)
+def write_side_nav_data(key, side_nav_data):
+    """Write a side navigation tree, the templates look it up by key with the side_nav filter."""
+    if not os.path.isdir(site_config.side_nav_dir):
+        os.makedirs(site_config.side_nav_dir)
 
-            redirect_md_file = os.path.join(site_config.redirects_markdown_path, f"{obj['title']}.md")
-            with open(redirect_md_file, "w", encoding="utf8") as md_file:
-                md_file.write(subs)
+    with open(os.path.join(site_config.side_nav_dir, f"{key}.json"), "w", encoding="utf8") as json_f:
+        json.dump(side_nav_data, json_f)
 
 
 def create_content_pages_dir():
@@ -891,3 +922,30 @@ def move_templates(module_name, module_template_path):
         for template in os.listdir(module_template_path):
             # Copy template to new directory
             shutil.copyfile(os.path.join(module_template_path, template), os.path.join(new_template_dir, template))
+
+
+def get_jobs():
+    """Return the number of worker processes requested with the --jobs flag."""
+    if site_config.args and getattr(site_config.args, "jobs", None):
+        return max(site_config.args.jobs, 1)
+    return 1
+
+
+def get_process_pool(jobs=None):
+    """Return a process pool whose workers are forked from the current process.
+
+    Workers inherit the relationship maps and memory stores that were already loaded, so they must be warmed
+    before the first task is submitted. Returns None when a single job was requested or fork is not available,
+    in which case the caller should run sequentially.
+    """
+    if jobs is None:
+        jobs = get_jobs()
+
+    if jobs <= 1:
+        return None
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("Parallel build requires the fork start method, building sequentially")
+        return None
+
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork"))
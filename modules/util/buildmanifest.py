@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+
+import stix2
+from loguru import logger
+
+from modules import site_config
+
+from . import relationshipgetters
+from . import relationshiphelpers as rsh
+
+# Files and directories that define how pages are rendered, a change in any of them rebuilds every page
+fingerprint_paths = [
+    "modules",
+    "attack-theme",
+    "pelicanconf.py",
+    "custom_jinja_filters.py",
+    "update-attack.py",
+    os.path.join("data", "versions.json"),
+]
+
+# Files generated by the build inside of the fingerprint paths
+fingerprint_generated_paths = [
+    os.path.join("attack-theme", "templates", "general", "base.html"),
+    os.path.join("attack-theme", "templates", "general", "sidebar-resources.html"),
+    os.path.join("attack-theme", "static", "scripts", "settings.js"),
+]
+
+# Arguments that do not change the generated pages
+fingerprint_ignored_args = [
+    "jobs",
+    "incremental",
+    "stix_store",
+    "tests",
+    "print_tests",
+    "override_exit_status",
+    "proxy",
+    "profile",
+    "precompress",
+    "profile_stats",
+    "no_map_cache",
+]
+
+manifest_filename = "manifest.json"
+
+# Manifest of the previous build, loaded on first use
+previous_manifest = None
+# Pages recorded during this build: page key => {"module", "dependencies", "pages"}
+current_pages = {}
+# Keys of the pages that were (re)generated during this build
+changed_pages = set()
+
+# stix_id => STIX objects that a page showing the object depends on, built on first use
+object_dependencies = {}
+
+
+def is_incremental():
+    """Return if the build should only regenerate the pages whose inputs changed."""
+    return bool(site_config.args and getattr(site_config.args, "incremental", False))
+
+
+def get_manifest_path():
+    """Return the path of the build manifest."""
+    return os.path.join(site_config.cache_directory, manifest_filename)
+
+
+def get_build_fingerprint():
+    """Return a hash of the code, templates and settings used to render the pages."""
+    fingerprint = hashlib.sha256()
+
+    files = []
+    for path in fingerprint_paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+
+        for directory, dirs, filenames in os.walk(path):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+
+            # Module templates are copied into the theme during the build
+            if directory == os.path.join("attack-theme", "templates"):
+                dirs[:] = [d for d in dirs if d in ["general", "macros"]]
+
+            files.extend(os.path.join(directory, filename) for filename in filenames)
+
+    for filepath in sorted(files):
+        if filepath in fingerprint_generated_paths:
+            continue
+        fingerprint.update(filepath.encode("utf8"))
+        with open(filepath, "rb") as f:
+            fingerprint.update(hashlib.sha256(f.read()).digest())
+
+    settings = {
+        "args": {
+            key: value for key, value in sorted(vars(site_config.args).items()) if key not in fingerprint_ignored_args
+        },
+        "banner_enabled": site_config.BANNER_ENABLED,
+        "banner_message": site_config.BANNER_MESSAGE,
+        "google_analytics": site_config.GOOGLE_ANALYTICS,
+        "google_site_verification": site_config.GOOGLE_SITE_VERIFICATION,
+        "include_osano": site_config.INCLUDE_OSANO,
+    }
+    fingerprint.update(json.dumps(settings, sort_keys=True, default=str).encode("utf8"))
+
+    return fingerprint.hexdigest()
+
+
+def get_previous_manifest():
+    """Return the manifest of the previous build, or an empty manifest if it can't be reused."""
+    global previous_manifest
+
+    if previous_manifest is None:
+        previous_manifest = {"fingerprint": get_build_fingerprint(), "pages": {}}
+
+        manifest_path = get_manifest_path()
+        if is_incremental() and os.path.isfile(manifest_path):
+            with open(manifest_path, "r", encoding="utf8") as f:
+                manifest = json.load(f)
+
+            if manifest.get("fingerprint") == previous_manifest["fingerprint"]:
+                previous_manifest["pages"] = manifest.get("pages", {})
+            else:
+                logger.info("Code, templates or settings changed since the last build, building every page")
+
+    return previous_manifest
+
+
+def get_object_dependencies(stix_id):
+    """Return the STIX objects that a page showing the given object depends on.
+
+    This is the object itself, its relationships, the objects on the other end of those
+    relationships, the objects they reference (e.g. the analytics of a detection strategy)
+    and the notes about the object.
+    """
+    global object_dependencies
+
+    if not object_dependencies:
+        srcs = relationshipgetters.get_srcs()
+
+        objects = {}
+        for src in srcs:
+            for obj in src.query():
+                if obj.get("id"):
+                    objects[obj["id"]] = obj
+
+        def get_references(obj):
+            references = set()
+            for key, value in obj.items():
+                if key.endswith("_ref") and isinstance(value, str) and value in objects:
+                    references.add(value)
+                elif key.endswith("_refs") and isinstance(value, list):
+                    references.update(ref for ref in value if ref in objects)
+            return references
+
+        dependencies = {stix_id: {stix_id} for stix_id in objects}
+        for relationship in rsh.query_all(srcs, [stix2.Filter("type", "=", "relationship")]):
+            for ref, other_ref in [
+                (relationship["source_ref"], relationship["target_ref"]),
+                (relationship["target_ref"], relationship["source_ref"]),
+            ]:
+                if ref not in dependencies:
+                    continue
+                dependencies[ref].add(relationship["id"])
+                if other_ref in objects:
+                    dependencies[ref].add(other_ref)
+                    dependencies[ref].update(get_references(objects[other_ref]))
+
+        for note in rsh.query_all(srcs, [stix2.Filter("type", "=", "note")]):
+            for ref in note.get("object_refs", []):
+                if ref in dependencies:
+                    dependencies[ref].add(note["id"])
+
+        object_dependencies = {
+            stix_id: sorted((dep, str(objects[dep].get("modified", ""))) for dep in deps)
+            for stix_id, deps in dependencies.items()
+        }
+
+    return object_dependencies.get(stix_id, [(stix_id, "")])
+
+
+def get_dependencies(stix_ids, listed_ids, *page_data):
+    """Return a hash of the STIX objects (and their modified timestamps) and page data a page depends on.
+
+    stix_ids are the objects the page is about, their related objects are included as well. listed_ids
+    are objects the page only lists, e.g. the techniques in a tactic, only the objects themselves are included.
+    """
+    dependencies = set()
+    for stix_id in stix_ids:
+        dependencies.update(get_object_dependencies(stix_id))
+    for stix_id in listed_ids:
+        dependencies.update(dep for dep in get_object_dependencies(stix_id) if dep[0] == stix_id)
+
+    digest = hashlib.sha256(json.dumps(sorted(dependencies)).encode("utf8"))
+    digest.update(json.dumps(page_data, sort_keys=True, default=str).encode("utf8"))
+
+    return digest.hexdigest()
+
+
+def get_save_as(markdown_path):
+    """Return the output path that Pelican renders the given markdown file to."""
+    with open(markdown_path, "r", encoding="utf8") as md_file:
+        for line in md_file:
+            if line.startswith("save_as:"):
+                return line[len("save_as:") :].strip()
+            if not line.strip():
+                break
+
+    return None
+
+
+def is_output_present(markdown_path):
+    """Return if the markdown file and the page rendered from it from the previous build exist."""
+    if not os.path.isfile(markdown_path):
+        return False
+
+    save_as = get_save_as(markdown_path)
+
+    return bool(save_as) and os.path.isfile(os.path.join(site_config.web_directory, save_as))
+
+
+def is_page_current(key, markdown_paths, dependencies, module):
+    """Record the pages generated for key and return if they are unchanged since the previous build.
+
+    key is the markdown path of the main page; markdown_paths are all of the pages generated with it
+    (e.g. a technique and its sub-techniques). Returns False when the pages have to be regenerated.
+    """
+    current_pages[key] = {"module": module, "dependencies": dependencies, "pages": sorted(markdown_paths)}
+
+    if is_incremental():
+        previous = get_previous_manifest()["pages"].get(key)
+        if (
+            previous
+            and previous["dependencies"] == dependencies
+            and previous["pages"] == current_pages[key]["pages"]
+            and all(is_output_present(path) for path in markdown_paths)
+        ):
+            return True
+
+    changed_pages.add(key)
+    return False
+
+
+def get_unchanged_markdown_files():
+    """Return the markdown files that were kept from the previous build and don't need to be rendered again."""
+    unchanged = []
+    for key, page in current_pages.items():
+        if key not in changed_pages:
+            unchanged.extend(page["pages"])
+
+    return sorted(unchanged)
+
+
+def remove_stale_pages():
+    """Remove the pages of the previous build that no longer exist, e.g. after an object was removed."""
+    if not is_incremental():
+        return
+
+    modules_run = {page["module"] for page in current_pages.values()}
+    current_paths = {path for page in current_pages.values() for path in page["pages"]}
+
+    for key, page in get_previous_manifest()["pages"].items():
+        # Pages of modules that didn't run in this build are left as they are
+        if page["module"] not in modules_run:
+            continue
+
+        for markdown_path in page["pages"]:
+            if markdown_path in current_paths or not os.path.isfile(markdown_path):
+                continue
+
+            save_as = get_save_as(markdown_path)
+            logger.info(f"Removing stale page: {markdown_path}")
+            os.remove(markdown_path)
+
+            if save_as and os.path.isfile(os.path.join(site_config.web_directory, save_as)):
+                os.remove(os.path.join(site_config.web_directory, save_as))
+
+
+def save_manifest():
+    """Write the manifest of this build so the next incremental build can skip unchanged pages."""
+    modules_run = {page["module"] for page in current_pages.values()}
+
+    pages = {key: page for key, page in get_previous_manifest()["pages"].items() if page["module"] not in modules_run}
+    pages.update(current_pages)
+
+    if not os.path.isdir(site_config.cache_directory):
+        os.makedirs(site_config.cache_directory)
+
+    with open(get_manifest_path(), "w", encoding="utf8") as f:
+        json.dump({"fingerprint": get_previous_manifest()["fingerprint"], "pages": pages}, f, indent=2)
+
+    if is_incremental():
+        logger.info(f"Regenerated {len(changed_pages)} of {len(current_pages)} tracked pages")
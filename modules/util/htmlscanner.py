@@ -0,0 +1,82 @@
+import mmap
+import os
+
+from loguru import logger
+
+import modules
+from modules import site_config
+
+from . import profiler
+
+# Registered visitors: {"module_name", "priority", "visit"}
+visitors = []
+
+# If the output directory was already scanned in this build
+scanned = False
+
+
+def register_visitor(module_name, priority, visit):
+    """Register a function to call with (filepath, html_str) for every HTML page of the output.
+
+    Visitors of a module are only called when the module is part of the build. Visitors are called in
+    priority order for each page; a visitor that returns a string replaces the page with it, and the
+    following visitors receive the new HTML.
+    """
+    visitors.append({"module_name": module_name, "priority": priority, "visit": visit})
+
+
+def read_html(filepath):
+    """Read an HTML file through a memory map, with newlines translated like a file opened in text mode."""
+    with open(filepath, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return ""
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as html_map:
+            html_str = html_map[:].decode("utf8")
+
+    if "\r" in html_str:
+        html_str = html_str.replace("\r\n", "\n").replace("\r", "\n")
+
+    return html_str
+
+
+def scan_output():
+    """Feed every HTML page of the output directory to the registered visitors, reading each page once.
+
+    Post-build modules call this before using the data their visitors collected. The output directory is
+    only scanned by the first of them, so the visitors of every module in the build run in that pass.
+    """
+    global scanned
+
+    if scanned:
+        return
+
+    running_modules = [ptr["module_name"].lower() for ptr in modules.run_ptr]
+    active_visitors = sorted(
+        [visitor for visitor in visitors if visitor["module_name"].lower() in running_modules],
+        key=lambda k: k["priority"],
+    )
+
+    logger.info(f"Scanning output pages for: {', '.join(visitor['module_name'] for visitor in active_visitors)}")
+
+    pages = 0
+    with profiler.stage("Output scan"):
+        for directory, _, files in os.walk(site_config.web_directory):
+            for filename in filter(lambda f: f.endswith(".html"), files):
+                filepath = os.path.join(directory, filename)
+                original_html_str = html_str = read_html(filepath)
+
+                for visitor in active_visitors:
+                    rewritten = visitor["visit"](filepath, html_str)
+                    if rewritten is not None:
+                        html_str = rewritten
+
+                if html_str != original_html_str:
+                    with open(filepath, mode="w", encoding="utf8") as updated_html:
+                        updated_html.write(html_str)
+
+                pages += 1
+
+    logger.info(f"Scanned {pages} output pages")
+
+    scanned = True
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+
+import stix2
+from loguru import logger
+
+from modules import site_config
+
+cache_directory_name = "relationship-maps"
+
+# Hash of the STIX bundles and of the code that derives the maps, computed on first use
+cache_key = None
+# If cached maps of other keys were already removed in this build
+stale_maps_removed = False
+
+
+def is_enabled():
+    """Return if derived maps are read from and written to the on-disk cache."""
+    return not getattr(site_config.args, "no_map_cache", False)
+
+
+def get_cache_key():
+    """Return a hash of the STIX bundles, the site config and the code and library versions that derive the maps."""
+    global cache_key
+
+    if cache_key is None:
+        key = hashlib.sha256()
+
+        for domain in site_config.domains:
+            # The bundles are copied (or downloaded) to the output directory when they are loaded
+            stix_filename = os.path.join(site_config.web_directory, "stix", f"{domain['name']}.json")
+            key.update(domain["name"].encode("utf8"))
+            with open(stix_filename, "rb") as f:
+                key.update(hashlib.sha256(f.read()).digest())
+
+        util_directory = os.path.dirname(__file__)
+        for filename in sorted(os.listdir(util_directory)):
+            if filename.endswith(".py"):
+                key.update(filename.encode("utf8"))
+                with open(os.path.join(util_directory, filename), "rb") as f:
+                    key.update(hashlib.sha256(f.read()).digest())
+
+        # Some maps depend on the site config, e.g. the resources skip the deprecated domains
+        with open(site_config.__file__, "rb") as f:
+            key.update(hashlib.sha256(f.read()).digest())
+        key.update(json.dumps(site_config.domains, sort_keys=True, default=str).encode("utf8"))
+
+        key.update(f"{stix2.__version__} {sys.version_info[:2]}".encode("utf8"))
+
+        cache_key = key.hexdigest()
+
+    return cache_key
+
+
+def get_cache_path(name):
+    """Return the path of the cache file of the given derived map."""
+    return os.path.join(site_config.cache_directory, cache_directory_name, get_cache_key(), f"{name}.pickle")
+
+
+def load(name):
+    """Return the cached value of a derived map, or None if it isn't cached for the current bundles and code."""
+    if not is_enabled():
+        return None
+
+    cache_path = get_cache_path(name)
+    if not os.path.isfile(cache_path):
+        return None
+
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except Exception as ex:
+        logger.warning(f"Ignoring unreadable relationship map cache {cache_path}: {type(ex).__name__}")
+        return None
+
+
+def save(name, value):
+    """Write a derived map to the cache, replacing the maps cached for previous bundles or code."""
+    global stale_maps_removed
+
+    if not is_enabled():
+        return
+
+    cache_path = get_cache_path(name)
+    key_directory = os.path.dirname(cache_path)
+
+    if not stale_maps_removed:
+        maps_directory = os.path.dirname(key_directory)
+        if os.path.isdir(maps_directory):
+            for directory in os.listdir(maps_directory):
+                if directory != get_cache_key():
+                    shutil.rmtree(os.path.join(maps_directory, directory), ignore_errors=True)
+        stale_maps_removed = True
+
+    if not os.path.isdir(key_directory):
+        os.makedirs(key_directory, exist_ok=True)
+
+    # Write to a temporary file first, worker processes may save the same map at the same time
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, cache_path)
@@ -0,0 +1,210 @@
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from loguru import logger
+
+from modules import site_config
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is not reported there
+    resource = None
+
+profile_directory_name = "profile"
+report_filename = "profile.json"
+table_filename = "profile.txt"
+
+# Stages in the order they started: {"name", "path", "depth", "wall_seconds", ...}
+stages = []
+# Names of the stages that are running, outermost first
+running = []
+
+# Deepest stages that report the files they wrote, e.g. the modules inside of the Total stage. The files of the
+# stages nested in them are counted in their parent, each snapshot walks the whole output
+files_written_depth = 1
+# Time spent taking file snapshots, left out of the timings of the stages that were running
+overhead = {"wall_seconds": 0.0, "cpu_seconds": 0.0}
+
+
+def is_enabled():
+    """Return if the build is profiled."""
+    return bool(getattr(site_config.args, "profile", False) or is_stats_enabled())
+
+
+def is_stats_enabled():
+    """Return if cProfile stats are written for each module."""
+    return bool(getattr(site_config.args, "profile_stats", False))
+
+
+def get_profile_directory():
+    """Return the directory the profile reports are written to, next to the test reports."""
+    return os.path.join(site_config.test_report_directory, profile_directory_name)
+
+
+def get_peak_rss_mb():
+    """Return the peak resident set size of the build and of its finished worker processes, in MB."""
+    if not resource:
+        return None
+
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def get_cpu_seconds():
+    """Return the CPU time used by the build and its finished worker processes."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def snapshot_files():
+    """Return path => (mtime, size) for the files that the build writes."""
+    files = {}
+    directories = [
+        site_config.content_dir,
+        site_config.parent_web_directory,
+        site_config.test_report_directory,
+        site_config.cache_directory,
+        site_config.templates_directory,
+    ]
+
+    pending = [directory for directory in directories if os.path.isdir(directory)]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    files[os.path.normpath(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+
+    return files
+
+
+def take_snapshot():
+    """Return snapshot_files(), adding the time it took to the profiler overhead."""
+    wall_start = time.perf_counter()
+    cpu_start = get_cpu_seconds()
+
+    files = snapshot_files()
+
+    overhead["wall_seconds"] += time.perf_counter() - wall_start
+    overhead["cpu_seconds"] += get_cpu_seconds() - cpu_start
+    return files
+
+
+@contextmanager
+def stage(name, stats=False):
+    """Record the wall-clock time, CPU time, peak RSS and files written by a stage of the build.
+
+    Stages can be nested, e.g. the Pelican render inside of the website_build module. Files written are only
+    reported down to files_written_depth, and the snapshots of the output are not part of any stage's timing.
+    Nothing is recorded unless the build runs with --profile. With stats=True and --profile-stats, a cProfile
+    dump of the stage is written as well.
+    """
+    if not is_enabled():
+        yield
+        return
+
+    record = {"name": name, "path": " > ".join(running + [name]), "depth": len(running)}
+    stages.append(record)
+    running.append(name)
+
+    track_files = record["depth"] <= files_written_depth
+    files_before = take_snapshot() if track_files else None
+
+    overhead_start = dict(overhead)
+    cpu_start = get_cpu_seconds()
+    wall_start = time.perf_counter()
+
+    profile = None
+    if stats and is_stats_enabled():
+        profile = cProfile.Profile()
+        profile.enable()
+
+    try:
+        yield
+    finally:
+        if profile:
+            profile.disable()
+
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = get_cpu_seconds() - cpu_start
+        # Snapshots taken by the nested stages
+        record["wall_seconds"] = round(wall_seconds - (overhead["wall_seconds"] - overhead_start["wall_seconds"]), 3)
+        record["cpu_seconds"] = round(cpu_seconds - (overhead["cpu_seconds"] - overhead_start["cpu_seconds"]), 3)
+        record["peak_rss_mb"] = get_peak_rss_mb()
+
+        record["files_written"] = None
+        record["bytes_written"] = None
+        if track_files:
+            written = [
+                size for path, (mtime, size) in take_snapshot().items() if files_before.get(path, (None,))[0] != mtime
+            ]
+            record["files_written"] = len(written)
+            record["bytes_written"] = sum(written)
+
+        running.pop()
+
+        if profile:
+            if not os.path.isdir(get_profile_directory()):
+                os.makedirs(get_profile_directory())
+            stats_path = os.path.join(get_profile_directory(), f"{name.lower()}.pstats")
+            profile.dump_stats(stats_path)
+            record["pstats"] = stats_path
+
+
+def get_table():
+    """Return the recorded stages as a readable table."""
+    header = f"{'Stage':<40} {'Wall (s)':>10} {'CPU (s)':>10} {'Peak RSS (MB)':>14} {'Files':>7} {'Written (MB)':>13}"
+    lines = [header, "-" * len(header)]
+
+    for record in stages:
+        name = "  " * record["depth"] + record["name"]
+        peak_rss = "-" if record["peak_rss_mb"] is None else f"{record['peak_rss_mb']:.1f}"
+        files = "-" if record["files_written"] is None else record["files_written"]
+        written = "-" if record["bytes_written"] is None else f"{record['bytes_written'] / (1024 * 1024):.2f}"
+        lines.append(
+            f"{name:<40} {record['wall_seconds']:>10.2f} {record['cpu_seconds']:>10.2f} {peak_rss:>14} "
+            f"{files:>7} {written:>13}"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def write_report():
+    """Write the recorded stages as JSON and as a table to the profile directory."""
+    if not is_enabled():
+        return
+
+    if not os.path.isdir(get_profile_directory()):
+        os.makedirs(get_profile_directory())
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "attack_version": site_config.attack_version,
+        "python_version": platform.python_version(),
+        "argv": sys.argv[1:],
+        "stages": stages,
+    }
+    with open(os.path.join(get_profile_directory(), report_filename), "w", encoding="utf8") as f:
+        json.dump(report, f, indent=2)
+
+    table = get_table()
+    with open(os.path.join(get_profile_directory(), table_filename), "w", encoding="utf8") as f:
+        f.write(table)
+
+    logger.info(f"Build profile written to {get_profile_directory()}\n{table}")
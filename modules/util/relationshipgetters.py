@@ -1,3 +1,4 @@
+from . import mapcache, profiler
 from . import relationshiphelpers as rsh
 from . import stixhelpers
 
@@ -46,6 +47,7 @@ campaign_list = []
 asset_list = []
 analytic_list = []
 detectionstrategy_list = []
+detection_index = {}
 
 technique_to_domain = {}
 logsource_to_detections = {}
@@ -53,12 +55,25 @@ logsource_to_detections = {}
 # Relationship getters
 
 
+def get_derived(name, derive):
+    """Return a derived map from the on-disk cache, or derive it with derive() and add it to the cache."""
+    # The cache is keyed by the loaded bundles
+    get_ms()
+
+    value = mapcache.load(name)
+    if value is None:
+        value = derive()
+        mapcache.save(name, value)
+
+    return value
+
+
 def get_malware_used_by_groups():
     """Return malware used by groups."""
     global malware_used_by_groups
 
     if not malware_used_by_groups:
-        malware_used_by_groups = rsh.malware_used_by_groups(get_srcs())
+        malware_used_by_groups = get_derived("malware_used_by_groups", lambda: rsh.malware_used_by_groups(get_srcs()))
 
     return malware_used_by_groups
 
@@ -68,7 +83,7 @@ def get_tools_used_by_groups():
     global tools_used_by_groups
 
     if not tools_used_by_groups:
-        tools_used_by_groups = rsh.tools_used_by_groups(get_srcs())
+        tools_used_by_groups = get_derived("tools_used_by_groups", lambda: rsh.tools_used_by_groups(get_srcs()))
 
     return tools_used_by_groups
 
@@ -78,7 +93,9 @@ def get_malware_used_by_campaigns():
     global malware_used_by_campaigns
 
     if not malware_used_by_campaigns:
-        malware_used_by_campaigns = rsh.malware_used_by_campaigns(get_srcs())
+        malware_used_by_campaigns = get_derived(
+            "malware_used_by_campaigns", lambda: rsh.malware_used_by_campaigns(get_srcs())
+        )
 
     return malware_used_by_campaigns
 
@@ -88,7 +105,9 @@ def get_tools_used_by_campaigns():
     global tools_used_by_campaigns
 
     if not tools_used_by_campaigns:
-        tools_used_by_campaigns = rsh.tools_used_by_campaigns(get_srcs())
+        tools_used_by_campaigns = get_derived(
+            "tools_used_by_campaigns", lambda: rsh.tools_used_by_campaigns(get_srcs())
+        )
 
     return tools_used_by_campaigns
 
@@ -98,7 +117,9 @@ def get_techniques_used_by_malware():
     global techniques_used_by_malware
 
     if not techniques_used_by_malware:
-        techniques_used_by_malware = rsh.techniques_used_by_malware(get_srcs())
+        techniques_used_by_malware = get_derived(
+            "techniques_used_by_malware", lambda: rsh.techniques_used_by_malware(get_srcs())
+        )
 
     return techniques_used_by_malware
 
@@ -108,7 +129,9 @@ def get_techniques_used_by_tools():
     global techniques_used_by_tools
 
     if not techniques_used_by_tools:
-        techniques_used_by_tools = rsh.techniques_used_by_tools(get_srcs())
+        techniques_used_by_tools = get_derived(
+            "techniques_used_by_tools", lambda: rsh.techniques_used_by_tools(get_srcs())
+        )
 
     return techniques_used_by_tools
 
@@ -118,7 +141,9 @@ def get_techniques_used_by_groups():
     global techniques_used_by_groups
 
     if not techniques_used_by_groups:
-        techniques_used_by_groups = rsh.techniques_used_by_groups(get_srcs())
+        techniques_used_by_groups = get_derived(
+            "techniques_used_by_groups", lambda: rsh.techniques_used_by_groups(get_srcs())
+        )
 
     return techniques_used_by_groups
 
@@ -128,7 +153,9 @@ def get_techniques_used_by_campaigns():
     global techniques_used_by_campaigns
 
     if not techniques_used_by_campaigns:
-        techniques_used_by_campaigns = rsh.techniques_used_by_campaigns(get_srcs())
+        techniques_used_by_campaigns = get_derived(
+            "techniques_used_by_campaigns", lambda: rsh.techniques_used_by_campaigns(get_srcs())
+        )
 
     return techniques_used_by_campaigns
 
@@ -138,7 +165,9 @@ def get_techniques_targeting_assets():
     global techniques_targeting_assets
 
     if not techniques_targeting_assets:
-        techniques_targeting_assets = rsh.techniques_targeting_assets(get_srcs())
+        techniques_targeting_assets = get_derived(
+            "techniques_targeting_assets", lambda: rsh.techniques_targeting_assets(get_srcs())
+        )
 
     return techniques_targeting_assets
 
@@ -148,7 +177,9 @@ def get_assets_targeted_by_techniques():
     global assets_targeted_by_techniques
 
     if not assets_targeted_by_techniques:
-        assets_targeted_by_techniques = rsh.assets_targeted_by_techniques(get_srcs())
+        assets_targeted_by_techniques = get_derived(
+            "assets_targeted_by_techniques", lambda: rsh.assets_targeted_by_techniques(get_srcs())
+        )
 
     return assets_targeted_by_techniques
 
@@ -157,7 +188,9 @@ def get_techniques_detected_by_detectionstrategy():
     global techniques_detected_by_detectionstrategy
 
     if not techniques_detected_by_detectionstrategy:
-        techniques_detected_by_detectionstrategy = rsh.techniques_detected_by_detectionstrategy(get_srcs())
+        techniques_detected_by_detectionstrategy = get_derived(
+            "techniques_detected_by_detectionstrategy", lambda: rsh.techniques_detected_by_detectionstrategy(get_srcs())
+        )
 
     return techniques_detected_by_detectionstrategy
 
@@ -166,7 +199,9 @@ def get_detectionstrategies_detecting_technique():
     global detectionstrategies_detecting_technique
 
     if not detectionstrategies_detecting_technique:
-        detectionstrategies_detecting_technique = rsh.detectionstrategy_detecting_technique(get_srcs())
+        detectionstrategies_detecting_technique = get_derived(
+            "detectionstrategies_detecting_technique", lambda: rsh.detectionstrategy_detecting_technique(get_srcs())
+        )
 
     return detectionstrategies_detecting_technique
 
@@ -176,7 +211,7 @@ def get_groups_using_tool():
     global groups_using_tool
 
     if not groups_using_tool:
-        groups_using_tool = rsh.groups_using_tool(get_srcs())
+        groups_using_tool = get_derived("groups_using_tool", lambda: rsh.groups_using_tool(get_srcs()))
 
     return groups_using_tool
 
@@ -186,7 +221,7 @@ def get_groups_using_malware():
     global groups_using_malware
 
     if not groups_using_malware:
-        groups_using_malware = rsh.groups_using_malware(get_srcs())
+        groups_using_malware = get_derived("groups_using_malware", lambda: rsh.groups_using_malware(get_srcs()))
 
     return groups_using_malware
 
@@ -196,7 +231,9 @@ def get_mitigation_mitigates_techniques():
     global mitigation_mitigates_techniques
 
     if not mitigation_mitigates_techniques:
-        mitigation_mitigates_techniques = rsh.mitigation_mitigates_techniques(get_srcs())
+        mitigation_mitigates_techniques = get_derived(
+            "mitigation_mitigates_techniques", lambda: rsh.mitigation_mitigates_techniques(get_srcs())
+        )
 
     return mitigation_mitigates_techniques
 
@@ -206,7 +243,9 @@ def get_technique_mitigated_by_mitigation():
     global technique_mitigated_by_mitigation
 
     if not technique_mitigated_by_mitigation:
-        technique_mitigated_by_mitigation = rsh.technique_mitigated_by_mitigation(get_srcs())
+        technique_mitigated_by_mitigation = get_derived(
+            "technique_mitigated_by_mitigation", lambda: rsh.technique_mitigated_by_mitigation(get_srcs())
+        )
 
     return technique_mitigated_by_mitigation
 
@@ -216,7 +255,7 @@ def get_tools_using_technique():
     global tools_using_technique
 
     if not tools_using_technique:
-        tools_using_technique = rsh.tools_using_technique(get_srcs())
+        tools_using_technique = get_derived("tools_using_technique", lambda: rsh.tools_using_technique(get_srcs()))
 
     return tools_using_technique
 
@@ -226,7 +265,9 @@ def get_malware_using_technique():
     global malware_using_technique
 
     if not malware_using_technique:
-        malware_using_technique = rsh.malware_using_technique(get_srcs())
+        malware_using_technique = get_derived(
+            "malware_using_technique", lambda: rsh.malware_using_technique(get_srcs())
+        )
 
     return malware_using_technique
 
@@ -236,7 +277,7 @@ def get_groups_using_technique():
     global groups_using_technique
 
     if not groups_using_technique:
-        groups_using_technique = rsh.groups_using_technique(get_srcs())
+        groups_using_technique = get_derived("groups_using_technique", lambda: rsh.groups_using_technique(get_srcs()))
 
     return groups_using_technique
 
@@ -246,7 +287,9 @@ def get_campaigns_using_technique():
     global campaigns_using_technique
 
     if not campaigns_using_technique:
-        campaigns_using_technique = rsh.campaigns_using_technique(get_srcs())
+        campaigns_using_technique = get_derived(
+            "campaigns_using_technique", lambda: rsh.campaigns_using_technique(get_srcs())
+        )
 
     return campaigns_using_technique
 
@@ -256,7 +299,7 @@ def get_campaigns_using_tool():
     global campaigns_using_tool
 
     if not campaigns_using_tool:
-        campaigns_using_tool = rsh.campaigns_using_tool(get_srcs())
+        campaigns_using_tool = get_derived("campaigns_using_tool", lambda: rsh.campaigns_using_tool(get_srcs()))
 
     return campaigns_using_tool
 
@@ -266,7 +309,9 @@ def get_campaigns_using_malware():
     global campaigns_using_malware
 
     if not campaigns_using_malware:
-        campaigns_using_malware = rsh.campaigns_using_malware(get_srcs())
+        campaigns_using_malware = get_derived(
+            "campaigns_using_malware", lambda: rsh.campaigns_using_malware(get_srcs())
+        )
 
     return campaigns_using_malware
 
@@ -276,7 +321,9 @@ def get_groups_attributed_to_campaigns():
     global groups_attributed_to_campaign
 
     if not groups_attributed_to_campaign:
-        groups_attributed_to_campaign = rsh.groups_attributed_to_campaign(get_srcs())
+        groups_attributed_to_campaign = get_derived(
+            "groups_attributed_to_campaign", lambda: rsh.groups_attributed_to_campaign(get_srcs())
+        )
 
     return groups_attributed_to_campaign
 
@@ -286,7 +333,9 @@ def get_campaigns_attributed_to_group():
     global campaigns_attributed_to_group
 
     if not campaigns_attributed_to_group:
-        campaigns_attributed_to_group = rsh.campaigns_attributed_to_group(get_srcs())
+        campaigns_attributed_to_group = get_derived(
+            "campaigns_attributed_to_group", lambda: rsh.campaigns_attributed_to_group(get_srcs())
+        )
 
     return campaigns_attributed_to_group
 
@@ -296,7 +345,7 @@ def get_subtechniques_of():
     global subtechniques_of
 
     if not subtechniques_of:
-        subtechniques_of = rsh.subtechniques_of(get_srcs())
+        subtechniques_of = get_derived("subtechniques_of", lambda: rsh.subtechniques_of(get_srcs()))
 
     return subtechniques_of
 
@@ -306,7 +355,7 @@ def get_datasource_of():
     global datasource_of
 
     if not datasource_of:
-        datasource_of = stixhelpers.datasource_of()
+        datasource_of = get_derived("datasource_of", lambda: stixhelpers.datasource_of())
 
     return datasource_of
 
@@ -316,7 +365,7 @@ def get_parent_technique_of():
     global parent_technique_of
 
     if not parent_technique_of:
-        parent_technique_of = rsh.parent_technique_of(get_srcs())
+        parent_technique_of = get_derived("parent_technique_of", lambda: rsh.parent_technique_of(get_srcs()))
 
     return parent_technique_of
 
@@ -326,7 +375,7 @@ def get_objects_using_notes():
     global objects_using_notes
 
     if not objects_using_notes:
-        objects_using_notes = rsh.get_objects_using_notes(get_srcs())
+        objects_using_notes = get_derived("objects_using_notes", lambda: rsh.get_objects_using_notes(get_srcs()))
 
     return objects_using_notes
 
@@ -338,7 +387,8 @@ def get_ms():
 
     if not ms:
         # Update both of them if one was not already declared
-        ms, srcs = stixhelpers.get_stix_memory_stores()
+        with profiler.stage("STIX load"):
+            ms, srcs = stixhelpers.get_stix_memory_stores()
 
     return ms
 
@@ -350,7 +400,8 @@ def get_srcs():
 
     if not srcs:
         # Update both of them if one was not already declared
-        ms, srcs = stixhelpers.get_stix_memory_stores()
+        with profiler.stage("STIX load"):
+            ms, srcs = stixhelpers.get_stix_memory_stores()
 
     return srcs
 
@@ -360,7 +411,7 @@ def get_resources():
     global resources
 
     if not resources:
-        resources = stixhelpers.grab_resources(get_ms())
+        resources = get_derived("resources", lambda: stixhelpers.grab_resources(get_ms()))
 
     return resources
 
@@ -465,24 +516,23 @@ def get_detectionstrategy_list():
     return detectionstrategy_list
 
 
+def get_detection_index():
+    """Return the lookups between analytics, detection strategies, data components and data sources."""
+    global detection_index
+
+    if not detection_index:
+        detection_index = stixhelpers.build_detection_index()
+
+    return detection_index
+
+
 def get_logsource_to_detections_mapping():
     """Get mapping from log sources to detection strategies and analytics"""
     global logsource_to_detections
-    global detectionstrategy_list
 
-    for detection_strategy in detectionstrategy_list:
-        analytics_list_for_detection_strategy = stixhelpers.get_analytics_from_detection_strategy(detection_strategy)
-        for analytic_list_for_detection_strategy in analytics_list_for_detection_strategy.values():
-            log_sources = analytic_list_for_detection_strategy.get("x_mitre_log_source_references", [])
-            for log_source in log_sources:
-                log_source_id = log_source.get("x_mitre_data_component_ref")
-                if log_source_id not in logsource_to_detections:
-                    logsource_to_detections[log_source_id] = []
-                already_exists = any(entry[0] == detection_strategy for entry in logsource_to_detections[log_source_id])
-                if not already_exists:
-                    logsource_to_detections[log_source_id].append(
-                        [detection_strategy, analytic_list_for_detection_strategy, log_source]
-                    )
+    if not logsource_to_detections:
+        logsource_to_detections = stixhelpers.logsource_to_detections()
+
     return logsource_to_detections
 
 
@@ -501,6 +551,8 @@ def get_technique_to_domain():
     global technique_to_domain
 
     if not technique_to_domain:
-        technique_to_domain = stixhelpers.get_technique_id_domain_map(get_ms())
+        technique_to_domain = get_derived(
+            "technique_to_domain", lambda: stixhelpers.get_technique_id_domain_map(get_ms())
+        )
 
     return technique_to_domain
@@ -5,12 +5,109 @@ from itertools import chain
 from loguru import logger
 from stix2 import Filter
 
+from . import profiler
+
 
 def query_all(srcs, filters):
     """Return the union of a query across multiple memorystores."""
     return list(chain.from_iterable(src.query(filters) for src in srcs))
 
 
+def get_type_from_id(stix_id):
+    """Return the STIX type portion of a STIX ID, e.g "attack-pattern" for "attack-pattern--<uuid>"."""
+    return stix_id.split("--")[0]
+
+
+def is_not_revoked(obj):
+    """Return whether the object passes a Filter("revoked", "=", False) query."""
+    return "revoked" in obj and obj["revoked"] is False
+
+
+def build_relationship_index(srcs):
+    """Build the relationship index for the given memorystores in a single pass.
+
+    The index holds every non-revoked, non-deprecated relationship bucketed by
+    (source_type, relationship_type, target_type) in both directions. Objects are
+    added by STIX ID for the types that the getters ask for, see get_indexed_objects.
+
+    params:
+        srcs: memorystores for enterprise and mobile in an array
+    """
+    index = {
+        # (source_type, relationship_type, target_type) => source_ref => [ {relationship, id} ]
+        "forward": {},
+        # (source_type, relationship_type, target_type) => target_ref => [ {relationship, id} ]
+        "reverse": {},
+        # stix_type => stix_id => object, filled per type on first use
+        "objects": {},
+        # stix_id => serialized object, filled lazily
+        "serialized": {},
+    }
+
+    # Deduplicate relationships across stores by STIX ID, keeping the first one seen
+    relationships = OrderedDict()
+    for relationship in query_all(srcs, [Filter("type", "=", "relationship"), Filter("revoked", "=", False)]):
+        if relationship["id"] not in relationships:
+            relationships[relationship["id"]] = relationship
+
+    for relationship in relationships.values():
+        if relationship.get("x_mitre_deprecated"):
+            continue
+
+        key = (
+            get_type_from_id(relationship.source_ref),
+            relationship.relationship_type,
+            get_type_from_id(relationship.target_ref),
+        )
+        index["forward"].setdefault(key, {}).setdefault(relationship.source_ref, []).append(
+            {"relationship": relationship, "id": relationship.target_ref}
+        )
+        index["reverse"].setdefault(key, {}).setdefault(relationship.target_ref, []).append(
+            {"relationship": relationship, "id": relationship.source_ref}
+        )
+
+    return index
+
+
+def get_indexed_objects(srcs, index, stix_type):
+    """Return stix_id => object of the given type, querying the memorystores only the first time the type is asked for.
+
+    Only the objects of the type are queried, so a store that parses objects lazily doesn't parse the whole bundle.
+    """
+    if stix_type not in index["objects"]:
+        objects = {}
+        # Later stores override earlier ones for objects that share a STIX ID
+        for obj in query_all(srcs, [Filter("type", "=", stix_type)]):
+            objects[obj["id"]] = obj
+        index["objects"][stix_type] = objects
+
+    return index["objects"][stix_type]
+
+
+# memorystores => relationship index, shared by all of the relationship getters
+relationship_indexes = {}
+
+
+def get_relationship_index(srcs):
+    """Return the relationship index for the given memorystores, building it on first use."""
+    key = tuple(id(src) for src in srcs)
+
+    if key not in relationship_indexes:
+        logger.info("Building relationship index")
+        with profiler.stage("Relationship index"):
+            relationship_indexes[key] = build_relationship_index(srcs)
+
+    return relationship_indexes[key]
+
+
+def serialize(index, obj):
+    """Return the JSON serializable form of a STIX object, serializing each object only once."""
+    if obj["id"] not in index["serialized"]:
+        index["serialized"][obj["id"]] = json.loads(obj.serialize())
+
+    return index["serialized"][obj["id"]]
+
+
 def get_related(srcs, src_type, rel_type, target_type, reverse=False):
     """Build relationship mappings.
 
@@ -21,89 +118,36 @@ def get_related(srcs, src_type, rel_type, target_type, reverse=False):
         target_type: target type for the relationship, e.g "intrusion-set"
         reverse: build reverse mapping of target to source
     """
-
-    relationships_with_dups = query_all(
-        srcs,
-        [
-            Filter("type", "=", "relationship"),
-            Filter("relationship_type", "=", rel_type),
-            Filter("revoked", "=", False),
-        ],
-    )
-
-    relationships_dict = OrderedDict()
-    for relationship in relationships_with_dups:
-        if relationship["id"] not in relationships_dict:
-            relationships_dict[relationship["id"]] = relationship
-
-    relationships = relationships_dict.values()
+    index = get_relationship_index(srcs)
 
     # stix_id => [ ids of objects with relationships with stix_id ]
-    id_to_related = {}
+    id_to_related = index["reverse" if reverse else "forward"].get((src_type, rel_type, target_type), {})
 
-    # build the dict
-    for relationship in relationships:
-        if relationship.get("x_mitre_deprecated"):
-            continue
-
-        if src_type in relationship.source_ref and target_type in relationship.target_ref:
-            if (relationship.source_ref in id_to_related and not reverse) or (
-                relationship.target_ref in id_to_related and reverse
-            ):
-                if not reverse:
-                    id_to_related[relationship.source_ref].append(
-                        {"relationship": relationship, "id": relationship.target_ref}
-                    )
-                else:
-                    id_to_related[relationship.target_ref].append(
-                        {"relationship": relationship, "id": relationship.source_ref}
-                    )
-            else:
-                if not reverse:
-                    id_to_related[relationship.source_ref] = [
-                        {"relationship": relationship, "id": relationship.target_ref}
-                    ]
-                else:
-                    id_to_related[relationship.target_ref] = [
-                        {"relationship": relationship, "id": relationship.source_ref}
-                    ]
-    # all objects of target type
-    if not reverse:
-        if target_type.startswith("x-mitre"):
-            targets = query_all(srcs, [Filter("type", "=", target_type)])
-        else:
-            targets = query_all(srcs, [Filter("type", "=", target_type), Filter("revoked", "=", False)])
-    else:
-        if src_type.startswith("x-mitre"):
-            targets = query_all(srcs, [Filter("type", "=", src_type)])
-        else:
-            targets = query_all(srcs, [Filter("type", "=", src_type), Filter("revoked", "=", False)])
-
-    id_to_target = {}
-    # build the dict
-    for target in targets:
-        if target.get("id"):
-            id_to_target[target["id"]] = target
+    # all objects of target type, revoked objects are only excluded for STIX types
+    related_type = src_type if reverse else target_type
+    id_to_target = get_indexed_objects(srcs, index, related_type)
+    include_revoked = related_type.startswith("x-mitre")
 
     output = {}
     for stix_id in id_to_related:
         value = []
         for related in id_to_related[stix_id]:
-            if not related["id"] in id_to_target:
+            target = id_to_target.get(related["id"])
+            if target is None or not (include_revoked or is_not_revoked(target)):
                 continue  # targetting a revoked object
 
             if related["id"].startswith("x-mitre"):
                 value.append(
                     {
-                        "object": id_to_target[related["id"]],
-                        "relationship": json.loads(related["relationship"].serialize()),
+                        "object": target,
+                        "relationship": serialize(index, related["relationship"]),
                     }
                 )
             else:
                 value.append(
                     {
-                        "object": json.loads(id_to_target[related["id"]].serialize()),
-                        "relationship": json.loads(related["relationship"].serialize()),
+                        "object": serialize(index, target),
+                        "relationship": serialize(index, related["relationship"]),
                     }
                 )
         output[stix_id] = value
@@ -12,6 +12,12 @@ from modules import site_config
 
 from . import buildhelpers, relationshipgetters
 from . import relationshiphelpers as rsh
+from .stixstore import CompactStore
+
+# STIX ID => object indexes of the loaded stores: (store, type) => {stix_id: object}
+object_indexes = {}
+# Tactic lists of the loaded stores: (store, domain, matrix_id) => [tactic]
+tactic_lists = {}
 
 
 def get_mitigation_list_from_src(src, get_deprecated=False):
@@ -102,8 +108,28 @@ def get_datacomponents(srcs):
     return results
 
 
+def get_object_index(src, stix_type):
+    """Return STIX ID => object for the objects of a type in a store, built once per store and type.
+
+    Like a query by ID, the first version of an object in the store is returned.
+    """
+    key = (id(src), stix_type)
+
+    if key not in object_indexes:
+        index = {}
+        for obj in src.query([stix2.Filter("type", "=", stix_type)]):
+            index.setdefault(obj["id"], obj)
+        object_indexes[key] = index
+
+    return object_indexes[key]
+
+
 def get_tactic_list(src, domain, matrix_id=None):
-    """Read the STIX and return a list of all tactics in the STIX."""
+    """Read the STIX and return a list of all tactics in the STIX, computed once per store, domain and matrix."""
+    key = (id(src), domain, matrix_id)
+    if key in tactic_lists:
+        return tactic_lists[key]
+
     tactics = []
     matrices = src.query(
         [
@@ -113,19 +139,23 @@ def get_tactic_list(src, domain, matrix_id=None):
 
     matrices = sorted(matrices, key=lambda k: len(k["tactic_refs"]), reverse=True)
 
+    # Matrices only reference tactics
+    tactics_by_id = get_object_index(src, "x-mitre-tactic")
+
     if matrix_id:
         for curr_matrix in matrices:
             if curr_matrix["id"] == matrix_id:
                 for tactic_id in curr_matrix["tactic_refs"]:
-                    tactics.append(src.query([stix2.Filter("id", "=", tactic_id)])[0])
+                    tactics.append(tactics_by_id[tactic_id])
     else:
         for matrix in matrices:
             for tactic_id in matrix["tactic_refs"]:
-                tactics.append(src.query([stix2.Filter("id", "=", tactic_id)])[0])
+                tactics.append(tactics_by_id[tactic_id])
 
     # Filter out by domain
     tactics = [x for x in tactics if not hasattr(x, "x_mitre_domains") or domain in x.get("x_mitre_domains")]
 
+    tactic_lists[key] = tactics
     return tactics
 
 
@@ -240,62 +270,97 @@ def datacomponent_of():
     return datacomponent_of
 
 
+def build_detection_index():
+    """Build the lookups between detection objects from the resource lists.
+
+    Returns a dict with data components, data sources and analytics by STIX ID, the detection strategies
+    that reference each analytic and the data source of each data component.
+    """
+
+    def by_id(objs):
+        """Map STIX ID to object, the first object wins like a search of the list."""
+        index = {}
+        for obj in objs:
+            index.setdefault(obj["id"], obj)
+        return index
+
+    datacomponents = by_id(relationshipgetters.get_datacomponent_list())
+    datasources = by_id(relationshipgetters.get_datasource_list())
+
+    detectionstrategies_of_analytic = {}
+    for detection_strategy in relationshipgetters.get_detectionstrategy_list():
+        for analytic_ref in dict.fromkeys(detection_strategy.get("x_mitre_analytic_refs", [])):
+            detectionstrategies_of_analytic.setdefault(analytic_ref, []).append(detection_strategy)
+
+    datasource_of_datacomponent = {}
+    for datacomponent in relationshipgetters.get_datacomponent_list():
+        datasource = datasources.get(datacomponent.get("x_mitre_data_source_ref"))
+        if datasource and datacomponent["id"] not in datasource_of_datacomponent:
+            datasource_of_datacomponent[datacomponent["id"]] = datasource
+
+    return {
+        "datacomponents": datacomponents,
+        "datasources": datasources,
+        "analytics": by_id(relationshipgetters.get_analytic_list()),
+        "detectionstrategies_of_analytic": detectionstrategies_of_analytic,
+        "datasource_of_datacomponent": datasource_of_datacomponent,
+    }
+
+
+def logsource_to_detections():
+    """Build map from log source data component STIX ID to [detection strategy, analytic, log source].
+
+    Each detection strategy is listed once for a log source, with the first of its analytics that references it,
+    in the order of the detection strategy list.
+    """
+    logsource_to_detections = {}
+    detectionstrategies_of_logsource = {}
+
+    for detection_strategy in relationshipgetters.get_detectionstrategy_list():
+        for analytic in get_analytics_from_detection_strategy(detection_strategy).values():
+            if not analytic:
+                continue
+
+            for log_source in analytic.get("x_mitre_log_source_references", []):
+                log_source_id = log_source.get("x_mitre_data_component_ref")
+                detections = logsource_to_detections.setdefault(log_source_id, [])
+                listed_ids = detectionstrategies_of_logsource.setdefault(log_source_id, set())
+
+                if detection_strategy["id"] not in listed_ids:
+                    listed_ids.add(detection_strategy["id"])
+                    detections.append([detection_strategy, analytic, log_source])
+
+    return logsource_to_detections
+
+
 def get_datacomponent_from_list(datacomponent_stix_id):
     """Return data component object with given stix id."""
-    datacomponents = relationshipgetters.get_datacomponent_list()
-    for dc in datacomponents:
-        if dc["id"] == datacomponent_stix_id:
-            return dc
-    return None
+    return relationshipgetters.get_detection_index()["datacomponents"].get(datacomponent_stix_id)
 
 
 def get_datasource_from_list(datasource_stix_id):
     """Return data source object with given data source stix id."""
-    datasources = relationshipgetters.get_datasource_list()
-
-    for datasource in datasources:
-        if datasource["id"] == datasource_stix_id:
-            return datasource
-
-    return None
+    return relationshipgetters.get_detection_index()["datasources"].get(datasource_stix_id)
 
 
 def datasource_of():
     """Build map from data component STIX ID to data source STIX object."""
-    datacomponents = relationshipgetters.get_datacomponent_list()
-
-    datasource_of = {}
-    for datacomponent in datacomponents:
-        if not datasource_of.get(datacomponent["id"]):
-            datasource = get_datasource_from_list(datacomponent.get("x_mitre_data_source_ref"))
-
-            if datasource:
-                datasource_of[datacomponent["id"]] = datasource
-
-    return datasource_of
+    return dict(relationshipgetters.get_detection_index()["datasource_of_datacomponent"])
 
 
 def get_analytic_from_list(analytic_stix_id):
     """Return analytic object with given stix id."""
-    analytics = relationshipgetters.get_analytic_list()
-    return next((analytic for analytic in analytics if analytic["id"] == analytic_stix_id), None)
+    return relationshipgetters.get_detection_index()["analytics"].get(analytic_stix_id)
 
 
 def get_related_detection_strategies(analytic_stix_id):
     """Return detection strategies referencing this analytic."""
-    detection_strategies = relationshipgetters.get_detectionstrategy_list()
-    references = []
-    for det in detection_strategies:
-        analytic_refs = det.get("x_mitre_analytic_refs", [])
-        if analytic_stix_id in analytic_refs:
-            references.append(det)
-    return references
+    return list(relationshipgetters.get_detection_index()["detectionstrategies_of_analytic"].get(analytic_stix_id, []))
 
 
 def get_analytics_from_detection_strategy(detection_strategy):
     """Build a lookup map for all analytics from the given detection strategy."""
-    all_analytics = relationshipgetters.get_analytic_list()
-    analytics_map = {analytic["id"]: analytic for analytic in all_analytics}
+    analytics_map = relationshipgetters.get_detection_index()["analytics"]
     analytic_refs = detection_strategy.get("x_mitre_analytic_refs", [])
     return {ref: analytics_map.get(ref) for ref in analytic_refs}
 
@@ -462,6 +527,11 @@ def get_stix_memory_stores():
     stix_output_dir = Path(f"{site_config.web_directory}/stix")
     stix_output_dir.mkdir(parents=True, exist_ok=True)
 
+    store_type = site_config.STIX_STORE
+    if site_config.args and site_config.args.stix_store:
+        store_type = site_config.args.stix_store
+    store_class = CompactStore if store_type == "compact" else stix2.MemoryStore
+
     for domain in site_config.domains:
         stix_filename = None
         logger.info(f"Loading {domain['name']} domain STIX from: {domain['location']}")
@@ -474,7 +544,7 @@ def get_stix_memory_stores():
             shutil.copy(domain["location"], str(stix_filename))
 
         if os.path.exists(stix_filename):
-            ms[domain["name"]] = stix2.MemoryStore()
+            ms[domain["name"]] = store_class()
             ms[domain["name"]].load_from_file(stix_filename)
         else:
             logger.error(f"\n{stix_filename} file does not exist.")
@@ -0,0 +1,204 @@
+import json
+from itertools import chain
+
+import stix2
+from stix2.datastore.filters import apply_common_filters
+from stix2.registry import class_for_type
+from stix2.utils import detect_spec_version
+
+from . import buildhelpers
+
+# Properties that are always present on the JSON of a valid object, their defaults are never needed
+ALWAYS_PRESENT_PROPERTIES = ["type", "spec_version", "id", "created", "modified"]
+
+
+class CompactStore:
+    """Read-only STIX object store indexed for build-time queries.
+
+    Implements the subset of the stix2.MemoryStore API used by the build (``load_from_file``,
+    ``query``, ``relationships``, ``get``). Objects are kept as parsed JSON and indexed by type,
+    STIX ID and ATT&CK ID; a stix2 object is only materialized when a query returns it.
+
+    Filters are evaluated against the JSON of the objects together with the default values that
+    stix2 would fill in (e.g. ``revoked``), so queries return the same objects, in the same order,
+    as a stix2.MemoryStore loaded from the same bundle.
+    """
+
+    def __init__(self):
+        # stix_id => modified => raw JSON object (objects without modified use None)
+        self._objects = {}
+        # stix_id => position in the store, used to keep MemoryStore ordering on index lookups
+        self._positions = {}
+        # stix_type => [stix_id]
+        self._ids_by_type = {}
+        # (stix_id, modified) => object with defaults applied, used to evaluate filters
+        self._records = {}
+        # (stix_id, modified) => materialized stix2 object
+        self._materialized = {}
+        # source_ref/target_ref => [relationship stix_id]
+        self._relationships_by_source = {}
+        self._relationships_by_target = {}
+        # attack_id => [stix_id], built on first use
+        self._ids_by_attack_id = None
+
+    def load_from_file(self, file_path, encoding="utf-8"):
+        """Load a STIX bundle or list of objects from a JSON file."""
+        with open(file_path, "r", encoding=encoding) as f:
+            self.add(json.load(f))
+
+    def add(self, stix_data):
+        """Add a bundle, a list of objects or a single object to the store."""
+        if isinstance(stix_data, list):
+            for stix_obj in stix_data:
+                self.add(stix_obj)
+        elif stix_data["type"] == "bundle":
+            for stix_obj in stix_data.get("objects", []):
+                self.add(stix_obj)
+        else:
+            self._add_object(stix_data)
+
+    def _add_object(self, raw):
+        stix_id = raw["id"]
+        versions = self._objects.get(stix_id)
+
+        if versions is None:
+            versions = self._objects[stix_id] = {}
+            self._positions[stix_id] = len(self._positions)
+            self._ids_by_type.setdefault(raw["type"], []).append(stix_id)
+
+            if raw["type"] == "relationship":
+                self._relationships_by_source.setdefault(raw.get("source_ref"), []).append(stix_id)
+                self._relationships_by_target.setdefault(raw.get("target_ref"), []).append(stix_id)
+
+        # MemoryStore only tracks versions for objects that have a modified timestamp
+        if "modified" not in raw:
+            versions.clear()
+
+        modified = raw.get("modified")
+        versions[modified] = raw
+        self._records.pop((stix_id, modified), None)
+        self._materialized.pop((stix_id, modified), None)
+        self._ids_by_attack_id = None
+
+    def _record(self, raw):
+        """Return the object as a MemoryStore filter would see it, with stix2 defaults applied."""
+        key = (raw["id"], raw.get("modified"))
+
+        if key not in self._records:
+            record = raw
+            obj_class = get_object_class(raw)
+            if obj_class:
+                defaults = {
+                    name: prop.default()
+                    for name, prop in obj_class._properties.items()
+                    if name not in raw and name not in ALWAYS_PRESENT_PROPERTIES and getattr(prop, "default", None)
+                }
+                if defaults:
+                    record = {**raw, **defaults}
+            self._records[key] = record
+
+        return self._records[key]
+
+    def _materialize(self, raw):
+        """Return the stix2 object for the given JSON object, parsing it on first use."""
+        key = (raw["id"], raw.get("modified"))
+
+        if key not in self._materialized:
+            self._materialized[key] = stix2.parse(raw, allow_custom=True)
+
+        return self._materialized[key]
+
+    def _candidate_ids(self, query):
+        """Return the STIX IDs that can match the query, using the narrowest available index."""
+        for filter_ in query:
+            if filter_.property == "id" and filter_.op == "=":
+                return [filter_.value] if filter_.value in self._objects else []
+            if filter_.property == "id" and filter_.op == "in":
+                ids = {stix_id for stix_id in filter_.value if stix_id in self._objects}
+                return sorted(ids, key=self._positions.get)
+
+        for filter_ in query:
+            if filter_.property == "type" and filter_.op == "=":
+                if filter_.value == "relationship":
+                    for ref_filter in query:
+                        if ref_filter.property == "source_ref" and ref_filter.op == "=":
+                            return self._relationships_by_source.get(ref_filter.value, [])
+                        if ref_filter.property == "target_ref" and ref_filter.op == "=":
+                            return self._relationships_by_target.get(ref_filter.value, [])
+                return self._ids_by_type.get(filter_.value, [])
+
+        return self._objects.keys()
+
+    def query(self, query=None):
+        """Return the stix2 objects matching all of the given filters."""
+        query = list(query or [])
+        candidates = chain.from_iterable(self._objects[stix_id].values() for stix_id in self._candidate_ids(query))
+
+        if query:
+            records = {id(self._record(raw)): raw for raw in candidates}
+            matches = [
+                records[id(record)]
+                for record in apply_common_filters([self._record(raw) for raw in records.values()], query)
+            ]
+        else:
+            matches = list(candidates)
+
+        return [self._materialize(raw) for raw in matches]
+
+    def get(self, stix_id):
+        """Return the latest version of the object with the given STIX ID, or None."""
+        versions = self._objects.get(stix_id)
+        if not versions:
+            return None
+
+        latest = None
+        for raw in versions.values():
+            if latest is None or raw.get("modified", "") > latest.get("modified", ""):
+                latest = raw
+
+        return self._materialize(latest)
+
+    def get_by_attack_id(self, attack_id):
+        """Return every object (all versions) that has the given ATT&CK ID."""
+        if self._ids_by_attack_id is None:
+            self._ids_by_attack_id = {}
+            for stix_id, versions in self._objects.items():
+                for raw in versions.values():
+                    raw_attack_id = buildhelpers.get_attack_id(raw)
+                    if raw_attack_id:
+                        ids = self._ids_by_attack_id.setdefault(raw_attack_id, [])
+                        if stix_id not in ids:
+                            ids.append(stix_id)
+
+        return self.query([stix2.Filter("id", "in", self._ids_by_attack_id.get(attack_id, []))])
+
+    def relationships(self, obj, relationship_type=None, source_only=False, target_only=False):
+        """Return the relationships involving the given STIX object or STIX ID."""
+        try:
+            obj_id = obj["id"]
+        except KeyError:
+            raise ValueError("STIX object has no 'id' property")
+        except TypeError:
+            # Assume obj is an ID string
+            obj_id = obj
+
+        if source_only and target_only:
+            raise ValueError("Search either source only or target only, but not both")
+
+        filters = [stix2.Filter("type", "=", "relationship")]
+        if relationship_type:
+            filters.append(stix2.Filter("relationship_type", "=", relationship_type))
+
+        results = []
+        if not target_only:
+            results.extend(self.query(filters + [stix2.Filter("source_ref", "=", obj_id)]))
+        if not source_only:
+            results.extend(self.query(filters + [stix2.Filter("target_ref", "=", obj_id)]))
+
+        return results
+
+
+def get_object_class(raw):
+    """Return the stix2 class that parses the given JSON object, None for unknown custom objects."""
+    version = detect_spec_version(raw)
+    return class_for_type(raw["type"], version, "objects") or class_for_type(raw["type"], version, "observables")
@@ -1,5 +1,10 @@
-from . import website_build
-from . import website_build_config
+from modules import util
+
+from . import fingerprint, precompress, website_build, website_build_config
+
+util.htmlscanner.register_visitor(
+    website_build_config.module_name, website_build_config.priority, fingerprint.replace_asset_links
+)
 
 
 def get_priority():
@@ -8,3 +13,7 @@ def get_priority():
 
 def run_module():
     return (website_build.generate_website(), website_build_config.module_name)
+
+
+def run_post_build():
+    return (precompress.precompress_output(), website_build_config.module_name)
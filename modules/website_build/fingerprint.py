@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from loguru import logger
+
+from modules import site_config
+
+from . import website_build_config
+
+# Theme asset path => path of its copy named after its content hash, e.g.
+# /theme/style-attack.css => /theme/style-attack.0123456789ab.css
+asset_manifest = {}
+
+# Copies written by this or previous builds: <name>.<hash>.<extension>
+fingerprinted_filename_regex = re.compile(
+    rf"\.[0-9a-f]{{{website_build_config.fingerprint_hash_length}}}"
+    rf"({'|'.join(re.escape(extension) for extension in website_build_config.fingerprint_file_extensions)})$"
+)
+
+# Quoted references to theme assets in the rendered pages, with an optional query string or fragment and the
+# subdirectory prefix of the pages already written by the subdirectory writer, compiled on first use
+asset_link_regex = None
+
+# Plain paths of the fingerprinted assets, to find the references that were not replaced, compiled on first use
+plain_asset_regex = None
+
+# (page, plain paths) of the pages that still reference fingerprinted assets by their plain path after the scan
+unfingerprinted_pages = []
+
+
+def is_enabled():
+    """Return if the theme assets are fingerprinted."""
+    return bool(getattr(site_config.args, "fingerprint_assets", False))
+
+
+def get_asset_link_regex():
+    """Return the pattern of the references to theme assets, with or without the subdirectory of the build."""
+    global asset_link_regex
+
+    if asset_link_regex is None:
+        prefix = f"(?:/{re.escape(site_config.subdirectory)})?" if site_config.subdirectory else ""
+        asset_link_regex = re.compile(rf"""(?<=["'])({prefix})(/theme/[^"'?#\s]+)(?=["'?#])""")
+
+    return asset_link_regex
+
+
+def get_theme_directory():
+    """Return the output directory of the theme static files."""
+    return os.path.join(site_config.web_directory, website_build_config.theme_output_directory)
+
+
+def fingerprint_assets():
+    """Copy the theme stylesheets and scripts to files named after their content hash and write the manifest.
+
+    References to the assets are replaced with the fingerprinted paths by replace_asset_links when the output is
+    scanned. The original files are kept for the scripts that load assets by their plain path.
+    """
+    global plain_asset_regex
+
+    if not is_enabled():
+        return
+
+    theme_directory = get_theme_directory()
+    if not os.path.isdir(theme_directory):
+        return
+
+    logger.info("Fingerprinting theme assets")
+    asset_manifest.clear()
+
+    for directory, _, files in os.walk(theme_directory):
+        for filename in sorted(files):
+            filepath = os.path.join(directory, filename)
+
+            # Copies of previous builds are replaced, the hash of their asset may have changed
+            if fingerprinted_filename_regex.search(filename):
+                os.remove(filepath)
+                continue
+
+            base, extension = os.path.splitext(filename)
+            if extension not in website_build_config.fingerprint_file_extensions:
+                continue
+
+            with open(filepath, "rb") as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()[: website_build_config.fingerprint_hash_length]
+
+            fingerprinted_filename = f"{base}.{content_hash}{extension}"
+            shutil.copyfile(filepath, os.path.join(directory, fingerprinted_filename))
+
+            relative_directory = os.path.relpath(directory, site_config.web_directory).replace(os.sep, "/")
+            asset_manifest[f"/{relative_directory}/{filename}"] = f"/{relative_directory}/{fingerprinted_filename}"
+
+    with open(os.path.join(theme_directory, website_build_config.fingerprint_manifest), "w", encoding="utf8") as f:
+        json.dump(asset_manifest, f, indent=2, sort_keys=True)
+
+    # Independent from asset_link_regex, so that the references it misses are found by check_asset_links
+    plain_asset_regex = None
+    if asset_manifest:
+        plain_paths = "|".join(re.escape(path) for path in sorted(asset_manifest, key=len, reverse=True))
+        plain_asset_regex = re.compile(rf"""({plain_paths})(?=["'?#])""")
+
+    logger.info(f"Fingerprinted {len(asset_manifest)} theme assets")
+
+
+def replace_asset_links(filepath, html_str):
+    """In the given page, replace the references to theme assets with their fingerprinted paths."""
+    if not asset_manifest:
+        return None
+
+    def replace(match):
+        # Pages kept by an incremental build already reference the copies of the previous build
+        path = fingerprinted_filename_regex.sub(r"\1", match.group(2))
+        return match.group(1) + asset_manifest.get(path, match.group(2))
+
+    html_str = get_asset_link_regex().sub(replace, html_str)
+
+    if plain_asset_regex:
+        plain_paths = sorted(set(plain_asset_regex.findall(html_str)))
+        if plain_paths:
+            unfingerprinted_pages.append((filepath, plain_paths))
+
+    return html_str
+
+
+def check_asset_links():
+    """Log the pages that still reference fingerprinted assets by their plain path after the output was scanned.
+
+    Returns if every page references the fingerprinted copies.
+    """
+    if not unfingerprinted_pages:
+        logger.info("Every page references the fingerprinted theme assets")
+        return True
+
+    for filepath, plain_paths in unfingerprinted_pages:
+        logger.error(f"{filepath} references theme assets by their plain path: {', '.join(plain_paths)}")
+
+    return False
@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import json
+import os
+
+from loguru import logger
+
+from modules import site_config, util
+
+from . import website_build_config
+
+
+def is_enabled():
+    """Return if compressed copies of the output files are written."""
+    return bool(getattr(site_config.args, "precompress", False))
+
+
+def get_cache_path():
+    """Return the path of the hashes of the files compressed by previous builds."""
+    return os.path.join(site_config.cache_directory, website_build_config.precompress_cache_filename)
+
+
+def load_cache():
+    """Return path => content hash of the files whose .gz copies were written by previous builds."""
+    cache_path = get_cache_path()
+    if not os.path.isfile(cache_path):
+        return {}
+
+    try:
+        with open(cache_path, "r", encoding="utf8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.warning(f"Ignoring unreadable precompression cache: {cache_path}")
+        return {}
+
+
+def save_cache(cache):
+    """Write the content hashes of the compressed files to the cache."""
+    if not os.path.isdir(site_config.cache_directory):
+        os.makedirs(site_config.cache_directory)
+
+    with open(get_cache_path(), "w", encoding="utf8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def is_compressible(filepath):
+    """Return if an output file is worth compressing."""
+    _, extension = os.path.splitext(filepath)
+    if extension not in website_build_config.precompress_file_extensions:
+        return False
+
+    return os.path.getsize(filepath) >= website_build_config.precompress_min_size
+
+
+def get_compressible_files():
+    """Return the output files that are worth compressing."""
+    filepaths = []
+
+    for directory, _, files in os.walk(site_config.parent_web_directory):
+        for filename in files:
+            filepath = os.path.join(directory, filename)
+            if is_compressible(filepath):
+                filepaths.append(filepath)
+
+    return sorted(filepaths)
+
+
+def remove_stale_copies(cache, filepaths):
+    """Remove the .gz copies written by previous builds for files that are gone or no longer worth compressing.
+
+    Only the copies recorded in the cache are removed, .gz files that are part of the output are kept.
+    """
+    removed = 0
+    for filepath in set(cache) - set(filepaths):
+        compressed_filepath = filepath + ".gz"
+        if os.path.isfile(compressed_filepath):
+            os.remove(compressed_filepath)
+            removed += 1
+
+    return removed
+
+
+def compress_file(filepath, cached_hash):
+    """Write the .gz copy of a file if its content changed, return (filepath, content hash, compressed)."""
+    with open(filepath, "rb") as f:
+        data = f.read()
+
+    content_hash = hashlib.sha256(data).hexdigest()
+
+    if content_hash == cached_hash and os.path.isfile(filepath + ".gz"):
+        return filepath, content_hash, False
+
+    # mtime=0 keeps the .gz files identical between builds of the same content
+    with open(filepath + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=website_build_config.gzip_level, mtime=0))
+
+    return filepath, content_hash, True
+
+
+def precompress_output():
+    """Write .gz copies of the compressible output files, for servers that serve them as they are.
+
+    Files whose content hash didn't change since the previous build keep their compressed copies. Without
+    --precompress, the copies written by previous builds are removed so that they can't be served stale.
+    """
+    cache = load_cache()
+
+    if not is_enabled():
+        if cache:
+            removed = remove_stale_copies(cache, [])
+            save_cache({})
+            logger.info(f"Removed {removed} compressed copies of previous builds")
+        return
+
+    filepaths = get_compressible_files()
+    removed = remove_stale_copies(cache, filepaths)
+    cached_hashes = [cache.get(filepath) for filepath in filepaths]
+
+    with util.profiler.stage("Precompression"):
+        pool = util.buildhelpers.get_process_pool()
+        if pool:
+            with pool:
+                results = list(pool.map(compress_file, filepaths, cached_hashes, chunksize=32))
+        else:
+            results = list(map(compress_file, filepaths, cached_hashes))
+
+    save_cache({filepath: content_hash for filepath, content_hash, _ in results})
+
+    compressed = sum(1 for _, _, was_compressed in results if was_compressed)
+    logger.info(
+        f"Precompressed {compressed} output files ({len(results) - compressed} unchanged, {removed} stale copies removed)"
+    )
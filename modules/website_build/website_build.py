@@ -1,15 +1,19 @@
 import hashlib
 import json
+import logging
 import os
-import subprocess
 from string import Template
 
 from loguru import logger
+from pelican import Pelican
+from pelican.log import init as pelican_init_logging
+from pelican.settings import read_settings
 
+import custom_jinja_filters
 import modules
 from modules import matrices, site_config, util
 
-from . import website_build_config
+from . import fingerprint, website_build_config
 
 
 def generate_website():
@@ -38,7 +42,15 @@ def generate_website():
     generate_static_pages()
     generate_changelog_page()
     store_pelican_settings()
-    pelican_content()
+    util.buildmanifest.remove_stale_pages()
+    with util.profiler.stage("Pelican render"):
+        pelican_content()
+    util.buildmanifest.save_manifest()
+    if fingerprint.is_enabled():
+        fingerprint.fingerprint_assets()
+        # Asset references are replaced while the output is scanned
+        util.htmlscanner.scan_output()
+        fingerprint.check_asset_links()
     # this is nice to have if you want to run pelican manually later
     # remove_pelican_settings()
 
@@ -227,11 +239,14 @@ def generate_changelog_page():
 
 
 def pelican_content():
+    """Render the content directory with Pelican in this process."""
     logger.info("Building website with Pelican")
-    pelican_cmd = "pelican content"
+
+    # Settings that the pelican command line would receive through -o and -e
+    overrides = {}
 
     if site_config.subdirectory:
-        pelican_cmd = f"{pelican_cmd} -o {site_config.web_directory}"
+        overrides["OUTPUT_PATH"] = os.path.abspath(site_config.web_directory)
 
     google_analytics = site_config.GOOGLE_ANALYTICS
     google_site_verification = site_config.GOOGLE_SITE_VERIFICATION
@@ -244,20 +259,29 @@ def pelican_content():
     if site_config.args.include_osano:
         include_osano = site_config.args.include_osano
 
-    extra_settings = ""
     if google_analytics:
-        extra_settings = f"{extra_settings} GOOGLE_ANALYTICS='\"{google_analytics}\"'"
+        overrides["GOOGLE_ANALYTICS"] = google_analytics
     if google_site_verification:
-        extra_settings = f"{extra_settings} GOOGLE_SITE_VERIFICATION='\"{google_site_verification}\"'"
+        overrides["GOOGLE_SITE_VERIFICATION"] = google_site_verification
     if include_osano:
-        extra_settings = f"{extra_settings} INCLUDE_OSANO='\"{include_osano}\"'"
+        overrides["INCLUDE_OSANO"] = include_osano
+
+    # Pages kept from the previous build are not rendered again
+    unchanged_markdown_files = util.buildmanifest.get_unchanged_markdown_files()
+    if unchanged_markdown_files:
+        logger.info(f"Skipping {len(unchanged_markdown_files)} unchanged pages")
+        overrides["IGNORE_FILES"] = [".#*"] + [os.path.basename(path) for path in unchanged_markdown_files]
+
+    logger.debug(f"{overrides=}")
 
-    if extra_settings:
-        pelican_cmd = f"{pelican_cmd} -e {extra_settings}"
+    # The custom filters read the staged settings instead of data/pelican_settings.json
+    custom_jinja_filters.pelican_settings = site_config.staged_pelican
 
-    logger.debug(f"{pelican_cmd=}")
+    pelican_init_logging(level=logging.WARNING, name="pelican")
+    settings = read_settings(website_build_config.pelican_settings_file, override=overrides)
+    Pelican(settings).run()
 
-    subprocess.check_output(pelican_cmd, shell=True)
+    custom_jinja_filters.log_markdown_cache_info()
 
 
 def remove_pelican_settings():
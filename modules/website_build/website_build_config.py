@@ -12,6 +12,9 @@ priority = 16
 # Template directory
 template_dir = os.path.join("attack-theme", "templates", "general/")
 
+# Pelican settings file
+pelican_settings_file = "pelicanconf.py"
+
 pyproject_toml = toml.load("pyproject.toml")
 website_version = pyproject_toml["tool"]["towncrier"]["version"]
 
@@ -60,3 +63,16 @@ website_build_templates_path = "modules/website_build/templates/"
 
 # CHANGELOG md
 changelog_md = "Title: Changelog\nTemplate: website_build/changelog\nsave_as: resources/changelog.html\n\n"
+
+# Precompressed copies of the output, served by nginx with gzip_static
+precompress_cache_filename = "precompress.json"
+precompress_file_extensions = [".html", ".json", ".js", ".css", ".svg", ".txt", ".xml", ".ttf", ".ico"]
+# Smaller files don't get smaller when compressed
+precompress_min_size = 256
+gzip_level = 9
+
+# Theme assets copied to files named after their content hash, served with immutable cache headers
+theme_output_directory = "theme"
+fingerprint_file_extensions = [".css", ".js"]
+fingerprint_hash_length = 12
+fingerprint_manifest = "asset-manifest.json"
@@ -51,6 +51,7 @@ JINJA_FILTERS = {
     "escape_spaces": custom_jinja_filters.escape_spaces,
     "stixToHTML": custom_jinja_filters.stixToHTML,
     "permalink": custom_jinja_filters.permalink,
+    "side_nav": custom_jinja_filters.side_nav,
 }
 
 MARKDOWN = {
@@ -0,0 +1,145 @@
+"""Check the external link checker against a local HTTP server.
+
+Run from the root of the project:
+
+    python test/test_externallinkchecker.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# modules/ is loaded relative to the root of the project
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tests import externallinkchecker, tests_config  # noqa: E402
+
+# Requests received by the server: (method, path) => count
+requests_received = Counter()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Stand-in for external sites.
+
+    /ok answers HEAD and GET, /no-head only GET, /moved redirects to /ok and /missing answers neither.
+    """
+
+    def answer(self, method):
+        """Record the request and answer it with the status of its path."""
+        requests_received[(method, self.path)] += 1
+
+        if self.path == "/moved":
+            self.send_response(301)
+            self.send_header("Location", "/ok")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.path == "/ok" or (self.path == "/no-head" and method == "GET"):
+            status = 200
+        elif self.path == "/no-head":
+            status = 405
+        else:
+            status = 404
+
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        """Answer a HEAD request."""
+        self.answer("HEAD")
+
+    def do_GET(self):
+        """Answer a GET request."""
+        self.answer("GET")
+
+    def log_message(self, format, *args):
+        """Keep the test output quiet."""
+
+
+class ExternalLinkCheckerTest(unittest.TestCase):
+    """HEAD to GET fallback and TTL cache of externallinkchecker.check_urls."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stand-in server on a free local port."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stand-in server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Reset the received requests and don't space out the requests to the server."""
+        requests_received.clear()
+        self.host_interval = tests_config.external_links_host_interval
+        tests_config.external_links_host_interval = 0
+        # Proxies of the environment must not be used for the local server
+        self.no_proxy = os.environ.get("NO_PROXY")
+        os.environ["NO_PROXY"] = "127.0.0.1"
+
+    def tearDown(self):
+        """Restore the settings changed by setUp."""
+        tests_config.external_links_host_interval = self.host_interval
+        if self.no_proxy is None:
+            os.environ.pop("NO_PROXY", None)
+        else:
+            os.environ["NO_PROXY"] = self.no_proxy
+
+    def test_head(self):
+        """A link that answers HEAD is only requested with HEAD."""
+        url = f"{self.base_url}/ok"
+        self.assertEqual(externallinkchecker.check_urls([url]), {url: None})
+        self.assertEqual(requests_received, Counter({("HEAD", "/ok"): 1}))
+
+    def test_head_fallback(self):
+        """A link that doesn't answer HEAD is checked again with GET."""
+        url = f"{self.base_url}/no-head"
+        self.assertEqual(externallinkchecker.check_urls([url]), {url: None})
+        self.assertEqual(requests_received, Counter({("HEAD", "/no-head"): 1, ("GET", "/no-head"): 1}))
+
+    def test_broken_link(self):
+        """A link that answers neither HEAD nor GET is reported with its status code."""
+        url = f"{self.base_url}/missing"
+        self.assertEqual(externallinkchecker.check_urls([url]), {url: 404})
+
+    def test_redirect(self):
+        """A link that redirects is reported with its redirect status, the redirect is not followed."""
+        url = f"{self.base_url}/moved"
+        self.assertEqual(externallinkchecker.check_urls([url]), {url: 301})
+        self.assertEqual(requests_received, Counter({("HEAD", "/moved"): 1}))
+
+    def test_ttl_cache(self):
+        """Reachable links are not requested again until the TTL passed, broken links are always requested."""
+        ok_url = f"{self.base_url}/ok"
+        missing_url = f"{self.base_url}/missing"
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = os.path.join(cache_dir, tests_config.external_links_cache_filename)
+
+            results = externallinkchecker.check_urls([ok_url, missing_url], cache_path=cache_path, ttl=3600)
+            self.assertEqual(results, {ok_url: None, missing_url: 404})
+            self.assertEqual(requests_received[("HEAD", "/ok")], 1)
+
+            # Within the TTL, the reachable link comes from the cache
+            results = externallinkchecker.check_urls([ok_url, missing_url], cache_path=cache_path, ttl=3600)
+            self.assertEqual(results, {ok_url: None, missing_url: 404})
+            self.assertEqual(requests_received[("HEAD", "/ok")], 1)
+            self.assertEqual(requests_received[("HEAD", "/missing")], 2)
+
+            # Once the TTL passed, it is requested again
+            externallinkchecker.check_urls([ok_url], cache_path=cache_path, ttl=0)
+            self.assertEqual(requests_received[("HEAD", "/ok")], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""Check buildhelpers.technique_used_helper against its previous implementation.
+
+Run from the root of the project:
+
+    python test/test_technique_used_helper.py
+"""
+
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+# modules/ is loaded relative to the root of the project
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import site_config  # noqa: E402
+from modules.util import buildhelpers, relationshipgetters  # noqa: E402
+
+TECHNIQUE_IDS = ["T1001", "T1001.001", "T1001.002", "T1001.003", "T1002", "T1002.001"]
+
+
+def previous_technique_used_helper(technique_list, technique, reference_list, inherited=False):
+    """technique_used_helper before the sub-techniques were inserted in place, which sorted them after every insertion."""
+    attack_id = buildhelpers.get_attack_id(technique["object"])
+
+    if attack_id:
+        if attack_id not in technique_list or inherited:
+            technique_data = buildhelpers.get_technique_data_helper(attack_id, technique, reference_list)
+            if not technique_data:
+                return technique_list
+            if buildhelpers.is_sub_tid(attack_id):
+                parent_id = buildhelpers.get_parent_technique_id(attack_id)
+
+                if parent_id not in technique_list:
+                    technique_list[parent_id] = buildhelpers.parent_technique_used_helper(parent_id)
+
+                for subtechnique in technique_list[parent_id]["subtechniques"]:
+                    if subtechnique["id"] == technique_data["id"] and inherited:
+                        subtechnique["color"] = 3
+                        if "descr" in technique_data and "descr" in subtechnique:
+                            subtechnique["descr"] += "\n\n" + technique_data["descr"]
+                        elif "descr" in technique_data:
+                            subtechnique["descr"] = technique_data["descr"]
+                        break
+                else:
+                    if inherited:
+                        technique_data["color"] = 2
+                    else:
+                        technique_data["color"] = 1
+                    technique_list[parent_id]["subtechniques"].append(technique_data)
+
+                technique_list[parent_id]["subtechniques"] = sorted(
+                    technique_list[parent_id]["subtechniques"], key=lambda k: k["id"]
+                )
+
+            else:
+                if attack_id in technique_list:
+                    technique_list[attack_id]["color"] = 3
+                    if "descr" in technique_data and "descr" in technique_list[attack_id]:
+                        technique_list[attack_id]["descr"] += "\n\n" + technique_data["descr"]
+                    elif "descr" in technique_data:
+                        technique_list[attack_id]["descr"] = technique_data["descr"]
+                else:
+                    if inherited:
+                        technique_data["color"] = 2
+                    else:
+                        technique_data["color"] = 1
+                    technique_list[attack_id] = technique_data
+
+        elif not technique_list[attack_id]["technique_used"]:
+            technique_list[attack_id]["technique_used"] = True
+
+            if technique["relationship"].get("description"):
+                technique_list[attack_id]["descr"] = technique["relationship"]["description"]
+                reference_list = buildhelpers.update_reference_list(reference_list, technique["relationship"])
+
+    return technique_list
+
+
+def new_technique(attack_id, description=None):
+    """Return a technique used by an object: {"object", "relationship"} as given by the relationship getters."""
+    relationship = {}
+    if description:
+        relationship["description"] = description
+
+    return {
+        "object": {
+            "name": f"Name of {attack_id}",
+            "external_references": [{"source_name": site_config.source_names[0], "external_id": attack_id}],
+        },
+        "relationship": relationship,
+    }
+
+
+class TechniqueUsedHelperTest(unittest.TestCase):
+    """Output of technique_used_helper for sequences of direct and inherited techniques."""
+
+    def setUp(self):
+        """Replace the getters that load the STIX bundles with the techniques of the test."""
+        technique_to_domain = {attack_id: "enterprise-attack" for attack_id in TECHNIQUE_IDS}
+        technique_list = [new_technique(attack_id)["object"] for attack_id in TECHNIQUE_IDS]
+
+        patches = [
+            mock.patch.object(relationshipgetters, "get_technique_to_domain", return_value=technique_to_domain),
+            mock.patch.object(relationshipgetters, "get_technique_list", return_value=technique_list),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_helper(self, helper, sequence):
+        """Add the (attack ID, description, inherited) of the sequence with the helper, return the techniques used."""
+        technique_list = {}
+        reference_list = {}
+        for attack_id, description, inherited in sequence:
+            helper(technique_list, new_technique(attack_id, description), reference_list, inherited=inherited)
+
+        return technique_list
+
+    def test_repeated_subtechnique(self):
+        """A sub-technique used directly twice, or inherited then used directly, is listed twice."""
+        technique_list = self.run_helper(
+            buildhelpers.technique_used_helper, [("T1001.001", "a", False), ("T1001.001", "b", False)]
+        )
+        self.assertEqual([sub["color"] for sub in technique_list["T1001"]["subtechniques"]], [1, 1])
+
+        technique_list = self.run_helper(
+            buildhelpers.technique_used_helper, [("T1001.001", "a", True), ("T1001.001", "b", False)]
+        )
+        self.assertEqual([sub["color"] for sub in technique_list["T1001"]["subtechniques"]], [2, 1])
+
+    def test_inherited_subtechnique(self):
+        """An inherited sub-technique that is already listed is merged into the first entry with its ID."""
+        technique_list = self.run_helper(
+            buildhelpers.technique_used_helper,
+            [("T1001.002", "a", False), ("T1001.001", "b", False), ("T1001.002", "c", True)],
+        )
+        subtechniques = technique_list["T1001"]["subtechniques"]
+        self.assertEqual([sub["id"] for sub in subtechniques], ["001", "002"])
+        self.assertEqual(subtechniques[1]["color"], 3)
+        self.assertEqual(subtechniques[1]["descr"], "a\n\nc")
+
+    def test_same_output_as_previous_implementation(self):
+        """Random sequences of direct and inherited techniques give the same techniques used as before."""
+        rng = random.Random(0)
+        for _ in range(1000):
+            sequence = [
+                (rng.choice(TECHNIQUE_IDS), rng.choice([None, "a", "b"]), rng.random() < 0.5)
+                for _ in range(rng.randint(1, 12))
+            ]
+            with self.subTest(sequence=sequence):
+                technique_list = self.run_helper(buildhelpers.technique_used_helper, sequence)
+                # Every technique of the sequence is found, the comparison is not between empty lists
+                self.assertTrue(technique_list)
+                self.assertEqual(technique_list, self.run_helper(previous_technique_used_helper, sequence))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,8 @@ from dotenv import load_dotenv
 from loguru import logger
 
 import modules
-from modules import site_config
+from modules import site_config, util
+from modules.redirections import redirections_config
 
 load_dotenv()
 
@@ -126,9 +127,7 @@ def get_parsed_args():
     parser.add_argument(
         "--version-archive-dir",
         type=str,
-        help=(
-            "If specified, sets the directory for the ATT&CK version archives. Defaults to attack-version-archives"
-        ),
+        help=("If specified, sets the directory for the ATT&CK version archives. Defaults to attack-version-archives"),
     )
     parser.add_argument(
         "--banner",
@@ -162,6 +161,76 @@ def get_parsed_args():
         action="store_true",
         help=("If specified, the site will include the Osano privacy compliance script."),
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes used to generate pages. Defaults to 1 (sequential build).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Keep the content and output of the previous build and only regenerate the pages whose STIX objects "
+            "changed since then. Every page is rebuilt if the code, templates or settings changed."
+        ),
+    )
+    parser.add_argument(
+        "--stix-store",
+        choices=["memory", "compact"],
+        help=(
+            "Object store used to load the STIX bundles. 'memory' uses stix2.MemoryStore, 'compact' uses an indexed "
+            "store that only parses the objects that are queried. Defaults to the STIX_STORE environment variable or memory."
+        ),
+    )
+
+    parser.add_argument(
+        "--no-map-cache",
+        action="store_true",
+        help=(
+            "Derive the relationship maps from the STIX bundles instead of loading them from the build cache. "
+            "Cached maps are only used when the bundles and the code that derives them are unchanged."
+        ),
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help=(
+            "Write gzip compressed copies of the output files next to them, for servers that serve them as they are "
+            "(nginx with gzip_static). GitHub Pages ignores them."
+        ),
+    )
+    parser.add_argument(
+        "--redirect-backend",
+        choices=redirections_config.redirect_backends,
+        help=(
+            "How redirects from old links are served. 'pages' renders a meta refresh page for each redirect, "
+            "'nginx' writes the redirects to an nginx map include (and a JSON table) in the redirects directory of "
+            "the output. Defaults to the REDIRECT_BACKEND environment variable or pages."
+        ),
+    )
+    parser.add_argument(
+        "--fingerprint-assets",
+        action="store_true",
+        help=(
+            "Copy the theme stylesheets and scripts to files named after their content hash and reference those "
+            "from the pages, so they can be served with immutable cache headers."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Record the wall-clock time, CPU time, peak memory and files written by each module and build stage. "
+            "The report is written as JSON and as a table to the profile directory of the test reports."
+        ),
+    )
+    parser.add_argument(
+        "--profile-stats",
+        action="store_true",
+        help="Also write a cProfile (pstats) dump for each module. Implies --profile.",
+    )
 
     args = parser.parse_args()
 
@@ -191,6 +260,9 @@ def remove_from_build(arg_modules, arg_extras):
                 copy_of_modules.append(module)
 
         modules.run_ptr = copy_of_modules
+        modules.post_build_ptr = [
+            module for module in modules.post_build_ptr if module["module_name"].lower() in arg_modules
+        ]
 
     def remove_from_menu():
         """Remove modules from menu if they are not in modules list from argument."""
@@ -234,17 +306,26 @@ def main():
     update_start = time.time()
 
     # Get running modules and priorities
-    for ptr in modules.run_ptr:
-        logger.info(f"RUNNING MODULE: {ptr['module_name']}")
-        start_time = time.time()
-        ptr["run_module"]()
-        end_time = time.time()
-        logger.info(f"FINISHED MODULE: {ptr['module_name']} in {end_time - start_time:.2f} seconds")
+    with util.profiler.stage("Total"):
+        for ptr in modules.run_ptr:
+            logger.info(f"RUNNING MODULE: {ptr['module_name']}")
+            start_time = time.time()
+            with util.profiler.stage(ptr["module_name"], stats=True):
+                ptr["run_module"]()
+            end_time = time.time()
+            logger.info(f"FINISHED MODULE: {ptr['module_name']} in {end_time - start_time:.2f} seconds")
+
+        # Post-build steps work on the final output, after the tests
+        for ptr in modules.post_build_ptr:
+            logger.info(f"RUNNING POST-BUILD: {ptr['module_name']}")
+            ptr["run_post_build"]()
 
     # Print end of module
     update_end = time.time()
     logger.info(f"TOTAL Update Time: {update_end - update_start:.2f} seconds")
 
+    util.profiler.write_report()
+
 
 if __name__ == "__main__":
     main()